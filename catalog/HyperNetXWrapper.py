@@ -3,17 +3,13 @@ import logging
 import os
 import hypernetx as hnx
 import pickle
-from IPython.display import display
 import pandas as pd
+import networkx as nx
 import matplotlib.pyplot as plt
 import matplotlib
 
 from .config import Config
-from .tools import drop_duplicates, df_difference
-
-# Libraries initialization
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', 1000)
+from .tools import custom_display, drop_duplicates, df_difference, memoized
 
 matplotlib.use('Qt5Agg')  # This sets the backend to plot (default TkAgg does not work)
 
@@ -35,6 +31,14 @@ class HyperNetXWrapper:
                 self.H = pickle.load(f)
         else:
             self.H = hnx.Hypergraph([])
+        # Results of memoized methods, which are only valid as long as the hypergraph does not change
+        self._cache = {}
+
+    def invalidate_cache(self) -> None:
+        """
+        Empties the results of memoized methods, which must be done every time the hypergraph is modified.
+        """
+        self._cache.clear()
 
     def save(self, file_path=None) -> None:
         if file_path is not None:
@@ -56,44 +60,70 @@ class HyperNetXWrapper:
         return edges
 
     def get_struct_names_inside_set_name(self, set_name) -> list[str]:
-        return pd.merge(self.get_outbound_set_by_name(set_name), self.get_inbound_structs().reset_index("edges", drop=False), on="nodes", how="inner")["edges"].to_list()
+        # A copy is returned, since callers may extend it (e.g., with nested structs)
+        return list(self.get_struct_names_by_set_name().get(set_name, []))
+
+    @memoized
+    def get_struct_names_by_set_name(self) -> dict[str, list[str]]:
+        """
+        Resolves at once the structs inside every set, instead of one merge per set.
+        :return: Dictionary with the list of names of the structs inside each set (sets without structs are not included)
+        """
+        struct_incidences = self.get_inbound_structs().index
+        struct_by_phantom = dict(zip(struct_incidences.get_level_values("nodes"), struct_incidences.get_level_values("edges")))
+        set_incidences = self.get_outbound_sets().index
+        struct_names = {}
+        for set_name, phantom_name in zip(set_incidences.get_level_values("edges"), set_incidences.get_level_values("nodes")):
+            if phantom_name in struct_by_phantom:
+                struct_names.setdefault(set_name, []).append(struct_by_phantom[phantom_name])
+        return struct_names
 
     def get_incidences(self) -> pd.DataFrame:
         incidences = self.H.incidences.dataframe
         return incidences
 
+    @memoized
     def get_attributes(self) -> pd.DataFrame:
         nodes = self.get_nodes()
-        attributes = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Attribute')]
+        attributes = nodes[nodes.index.map(self.get_node_kind_index()) == 'Attribute']
         return attributes
 
     def get_attribute_by_name(self, attr_name) -> pd.Series:
-        attribute = self.get_attributes().query('nodes == "' + attr_name + '"')
+        attributes = self.get_attributes()
+        attribute = attributes[attributes.index == attr_name]
         return attribute.iloc[0]
 
+    @memoized
     def get_association_ends(self) -> pd.DataFrame:
         ends = self.get_outbound_associations()
         if not ends.empty:
             ends.reset_index(drop=False, inplace=True)
-            ends["name"] = ends.apply(lambda x: x["misc_properties"]["End_name"], axis=1)
+            ends["name"] = [properties["End_name"] for properties in ends["misc_properties"]]
             ends.set_index('name', drop=False, inplace=True)
             ends.drop(columns=['weight'], inplace=True)
         return ends
 
     def get_association_ends_by_name(self, association_name) -> pd.DataFrame:
-        ends = self.get_association_ends().query('edges == "' + association_name + '"')
-        return ends
+        ends = self.get_association_ends()
+        if ends.empty:
+            return ends
+        return ends[ends["edges"] == association_name]
 
     def get_class_name_by_end_name(self, end_name) -> str:
-        association_end = self.get_association_ends()[self.get_association_ends()["misc_properties"].apply(lambda x: x["End_name"] == end_name)]
+        association_ends = self.get_association_ends()
+        # Association ends are indexed by their name
+        association_end = association_ends[association_ends.index == end_name]
         return self.get_edge_by_phantom_name(association_end.iloc[0].nodes)
 
+    @memoized
     def get_ids(self) -> pd.DataFrame:
         outbounds = self.get_outbound_classes()
         incidences = outbounds[outbounds["misc_properties"].apply(lambda x: x['Identifier'])].reset_index(level='edges', drop=True)
-        ids = self.get_attributes()[self.get_attributes()["name"].isin(incidences.index)]
+        attributes = self.get_attributes()
+        ids = attributes[attributes["name"].isin(incidences.index)]
         return ids
 
+    @memoized
     def get_class_id_by_name(self, class_name) -> str:
         superclasses = self.get_superclasses_by_class_name(class_name)
         if not superclasses:
@@ -105,166 +135,312 @@ class HyperNetXWrapper:
         assert not class_id.empty, f"Class {class_name} does not have an identifier"
         return class_id.index[0][1]
 
+    @memoized
+    def get_class_names_by_attribute_name(self) -> dict[str, list[str]]:
+        """
+        Outbound incidences of all classes are grouped once by attribute, so that the class of an attribute is just looked up.
+        :return: Dictionary with the names of the classes containing every attribute
+        """
+        class_names = {}
+        if self.get_incidences().empty:
+            return class_names
+        outbound_classes = self.get_outbound_classes().index
+        for class_name, attribute_name in zip(outbound_classes.get_level_values("edges"), outbound_classes.get_level_values("nodes")):
+            class_names.setdefault(attribute_name, []).append(class_name)
+        return class_names
+
     def get_class_by_attribute_name(self, attribute_name) -> str:
-        classes = self.get_outbound_classes().query('nodes == "' + attribute_name + '"').index.get_level_values("edges")
+        classes = self.get_class_names_by_attribute_name().get(attribute_name, [])
         assert len(classes) == 1, f"Attribute {attribute_name} does not have exactly one class"
         return classes[0]
 
+    @memoized
     def get_phantoms(self) -> pd.DataFrame:
         nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom')]
+        phantoms = nodes[nodes.index.map(self.get_node_kind_index()) == 'Phantom']
         return phantoms
 
+    @memoized
     def get_phantom_classes(self) -> pd.DataFrame:
-        nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom' and
-                                                                  x['Subkind'] == 'Class')]
+        phantoms = self.get_phantoms()
+        phantoms = phantoms[phantoms.index.map(self.get_phantom_subkind_index()) == 'Class']
         return phantoms
 
+    @memoized
     def get_phantom_associations(self) -> pd.DataFrame:
-        nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom' and
-                                                                  x['Subkind'] == 'Association')]
+        phantoms = self.get_phantoms()
+        phantoms = phantoms[phantoms.index.map(self.get_phantom_subkind_index()) == 'Association']
         return phantoms
 
+    @memoized
     def get_phantom_generalizations(self) -> pd.DataFrame:
-        nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom' and
-                                                                  x['Subkind'] == 'Generalization')]
+        phantoms = self.get_phantoms()
+        phantoms = phantoms[phantoms.index.map(self.get_phantom_subkind_index()) == 'Generalization']
         return phantoms
 
+    @memoized
     def get_phantom_structs(self) -> pd.DataFrame:
-        nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom' and
-                                                                  x['Subkind'] == 'Struct')]
+        phantoms = self.get_phantoms()
+        phantoms = phantoms[phantoms.index.map(self.get_phantom_subkind_index()) == 'Struct']
         return phantoms
 
+    @memoized
     def get_phantom_sets(self) -> pd.DataFrame:
-        nodes = self.get_nodes()
-        phantoms = nodes[nodes["misc_properties"].apply(lambda x: x['Kind'] == 'Phantom' and
-                                                                  x['Subkind'] == 'Set')]
+        phantoms = self.get_phantoms()
+        phantoms = phantoms[phantoms.index.map(self.get_phantom_subkind_index()) == 'Set']
         return phantoms
 
-    def get_edge_by_phantom_name(self, phantom_name) -> str:
-        # return self.get_inbounds()[self.get_inbounds().index.get_level_values('nodes') == phantom_name].index[0][0]
+    @memoized
+    def get_phantom_edge_index(self) -> dict[str, str]:
+        """
+        Inbound incidences relate every phantom to its edge, so that all of them are resolved at once.
+        :return: Dictionary with the name of the edge of every phantom
+        """
+        phantom_edges = {}
+        if not self.get_incidences().empty:
+            inbounds = self.get_inbounds().index
+            for edge_name, phantom_name in zip(inbounds.get_level_values("edges"), inbounds.get_level_values("nodes")):
+                phantom_edges.setdefault(phantom_name, edge_name)
+        return phantom_edges
+
+    @memoized
+    def get_edge_phantom_index(self) -> dict[str, str]:
+        """
+        Inverse of the phantom edge index.
+        :return: Dictionary with the name of the phantom of every edge
+        """
+        edge_phantoms = {}
+        for phantom_name, edge_name in self.get_phantom_edge_index().items():
+            edge_phantoms.setdefault(edge_name, phantom_name)
+        return edge_phantoms
+
+    @memoized
+    def get_node_kind_index(self) -> dict[str, str]:
+        """
+        Kinds of all nodes (i.e., Attribute or Phantom), to check them without filtering the nodes.
+        :return: Dictionary with the kind of every node
+        """
+        nodes = self.get_nodes()
+        return dict(zip(nodes.index, nodes["misc_properties"].apply(lambda x: x.get('Kind'))))
+
+    @memoized
+    def get_incidence_properties_index(self) -> dict[tuple[str, str], dict]:
+        """
+        Properties of all incidences, to look them up without querying the incidence store of the hypergraph.
+        :return: Dictionary with the properties of every pair of edge and node
+        """
         incidences = self.get_incidences()
-        phantom_incidences = incidences.xs(phantom_name, level="nodes", drop_level=False)
-        phantom_inbounds = phantom_incidences[phantom_incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound')]
-        return phantom_inbounds.index[0][0]
+        if incidences.empty:
+            return {}
+        return dict(zip(incidences.index, incidences["misc_properties"]))
 
-    def get_phantom_of_edge_by_name(self, edge_name) -> str:
-        # return self.get_inbounds().loc[edge_name].index[0]
+    @memoized
+    def get_incidence_kinds(self) -> pd.DataFrame:
+        """
+        Direction, kind and subkind of all incidences, projected once out of their properties into their own columns,
+        so that incidences are selected with vectorized masks instead of reading the properties of every row.
+        :return: Dataframe with the same index as the incidences and one column per property
+        """
         incidences = self.get_incidences()
-        edge_incidences = incidences.xs(edge_name, level="edges", drop_level=False)
-        edge_inbounds = edge_incidences[edge_incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound')]
-        return edge_inbounds.index[0][1]
+        properties = incidences["misc_properties"].to_list() if not incidences.empty else []
+        return pd.DataFrame({"Direction": [p.get('Direction') for p in properties],
+                             "Kind": [p.get('Kind') for p in properties],
+                             "Subkind": [p.get('Subkind') for p in properties]}, index=incidences.index)
+
+    @memoized
+    def get_outbound_node_names_by_edge_name(self) -> dict[str, list[str]]:
+        """
+        Groups the outbound incidences by edge, so that the elements of any edge can be found without filtering all of them.
+        :return: Dictionary with the list of outbound node names of every edge (edges without outbounds are not included)
+        """
+        node_names = {}
+        outbounds = self.get_outbounds().index
+        if not outbounds.empty:
+            for edge_name, node_name in zip(outbounds.get_level_values("edges"), outbounds.get_level_values("nodes")):
+                node_names.setdefault(edge_name, []).append(node_name)
+        return node_names
+
+    @memoized
+    def get_edge_kind_index(self) -> dict[str, str]:
+        """
+        Kinds of all edges (i.e., Class, Association, Generalization, Struct or Set), to check them without filtering the edges.
+        :return: Dictionary with the kind of every edge
+        """
+        edges = self.get_edges()
+        return dict(zip(edges.index, edges["misc_properties"].apply(lambda x: x.get('Kind'))))
+
+    @memoized
+    def get_association_ends_ahead_index(self) -> dict[tuple[str, str], list[tuple[str, dict]]]:
+        """
+        Association ends that are reached when traversing every association from one of its class phantoms.
+        It allows to follow paths without filtering the association ends at every step.
+        :return: Dictionary with the list of pairs of end name and properties ahead, for every pair of association and phantom behind
+        """
+        ends_ahead = {}
+        ends = self.get_association_ends()
+        if not ends.empty:
+            ends_by_association = {}
+            for end_name, association_name, phantom_name, properties in zip(ends.index, ends["edges"], ends["nodes"], ends["misc_properties"]):
+                ends_by_association.setdefault(association_name, []).append((end_name, phantom_name, properties))
+            for association_name, association_ends in ends_by_association.items():
+                for _, phantom_behind, _ in association_ends:
+                    ends_ahead[(association_name, phantom_behind)] = [(end_name, properties) for end_name, phantom_name, properties in association_ends if phantom_name != phantom_behind]
+        return ends_ahead
+
+    @memoized
+    def get_phantom_subkind_index(self) -> dict[str, str]:
+        """
+        Subkinds of all phantoms (i.e., Class, Association, Generalization, Struct or Set), to check them without filtering the nodes.
+        :return: Dictionary with the subkind of every phantom
+        """
+        phantoms = self.get_phantoms()
+        return dict(zip(phantoms.index, phantoms["misc_properties"].apply(lambda x: x.get('Subkind'))))
+
+    @memoized
+    def get_id_names(self) -> frozenset[str]:
+        """
+        Names of all the attributes that identify some class, to check them without filtering the attributes.
+        :return: Set of names of the identifiers
+        """
+        return frozenset(self.get_ids().index)
+
+    @memoized
+    def get_association_end_names(self) -> frozenset[str]:
+        """
+        Names of all the association ends, to check them without rebuilding the ends from the incidences.
+        :return: Set of names of the association ends
+        """
+        return frozenset(self.get_association_ends().index)
+
+    def get_edge_by_phantom_name(self, phantom_name) -> str:
+        return self.get_phantom_edge_index()[phantom_name]
+
+    def get_phantom_of_edge_by_name(self, edge_name) -> str:
+        return self.get_edge_phantom_index()[edge_name]
 
+    @memoized
     def get_classes(self) -> pd.DataFrame:
         edges = self.get_edges()
-        classes = edges[edges["misc_properties"].apply(lambda x: x['Kind'] == 'Class')]
+        classes = edges[edges.index.map(self.get_edge_kind_index()) == 'Class']
         return classes
 
+    @memoized
     def get_associations(self) -> pd.DataFrame:
         edges = self.get_edges()
-        associations = edges[edges["misc_properties"].apply(lambda x: x['Kind'] == 'Association')]
+        associations = edges[edges.index.map(self.get_edge_kind_index()) == 'Association']
         return associations
 
+    @memoized
     def get_generalizations(self) -> pd.DataFrame:
         edges = self.get_edges()
-        associations = edges[edges["misc_properties"].apply(lambda x: x['Kind'] == 'Generalization')]
+        associations = edges[edges.index.map(self.get_edge_kind_index()) == 'Generalization']
         return associations
 
+    @memoized
     def get_structs(self) -> pd.DataFrame:
         edges = self.get_edges()
-        structs = edges[edges["misc_properties"].apply(lambda x: x['Kind'] == 'Struct')]
+        structs = edges[edges.index.map(self.get_edge_kind_index()) == 'Struct']
         return structs
 
+    @memoized
     def get_sets(self) -> pd.DataFrame:
         edges = self.get_edges()
-        sets = edges[edges["misc_properties"].apply(lambda x: x['Kind'] == 'Set')]
+        sets = edges[edges.index.map(self.get_edge_kind_index()) == 'Set']
         return sets
 
+    @memoized
     def get_inbounds(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[kinds["Direction"] == 'Inbound']
         return inbounds
 
+    @memoized
     def get_inbound_classes(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound' and
-                                                                            x['Kind'] == 'ClassIncidence')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[(kinds["Direction"] == 'Inbound') & (kinds["Kind"] == 'ClassIncidence')]
         return inbounds
 
+    @memoized
     def get_inbound_associations(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound' and
-                                                                            x['Kind'] == 'AssociationIncidence')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[(kinds["Direction"] == 'Inbound') & (kinds["Kind"] == 'AssociationIncidence')]
         return inbounds
 
+    @memoized
     def get_inbound_generalizations(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound' and
-                                                                            x['Kind'] == 'GeneralizationIncidence')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[(kinds["Direction"] == 'Inbound') & (kinds["Kind"] == 'GeneralizationIncidence')]
         return inbounds
 
+    @memoized
     def get_inbound_structs(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound' and
-                                                                            x['Kind'] == 'StructIncidence')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[(kinds["Direction"] == 'Inbound') & (kinds["Kind"] == 'StructIncidence')]
         return inbounds
 
+    @memoized
     def get_inbound_sets(self) -> pd.DataFrame:
         incidences = self.get_incidences()
-        inbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Inbound' and
-                                                                            x['Kind'] == 'SetIncidence')]
+        kinds = self.get_incidence_kinds()
+        inbounds = incidences[(kinds["Direction"] == 'Inbound') & (kinds["Kind"] == 'SetIncidence')]
         return inbounds
 
+    @memoized
     def get_outbounds(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[kinds["Direction"] == 'Outbound']
             return outbounds
 
+    @memoized
     def get_outbound_associations(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'AssociationIncidence')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'AssociationIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_generalization_superclasses(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'GeneralizationIncidence' and
-                                                                                 x['Subkind'] == 'Superclass')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'GeneralizationIncidence') & (kinds["Subkind"] == 'Superclass')]
             return outbounds
 
+    @memoized
     def get_outbound_generalization_subclasses(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'GeneralizationIncidence' and
-                                                                                 x['Subkind'] == 'Subclass')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'GeneralizationIncidence') & (kinds["Subkind"] == 'Subclass')]
             return outbounds
 
+    @memoized
     def get_outbound_structs(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'StructIncidence')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'StructIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_association_by_name(self, ass_name) -> pd.DataFrame:
         # elements = self.get_outbound_associations().query('edges == "' + ass_name + '"')
         # return elements
@@ -277,6 +453,7 @@ class HyperNetXWrapper:
                                                                                              x['Kind'] == 'AssociationIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_struct_by_name(self, struct_name) -> pd.DataFrame:
         # elements = self.get_outbound_structs().query('edges == "' + struct_name + '"')
         # return elements
@@ -289,6 +466,7 @@ class HyperNetXWrapper:
                                                                                              x['Kind'] == 'StructIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_set_by_name(self, set_name) -> pd.DataFrame:
         # elements = self.get_outbound_sets().query('edges == "' + set_name + '"')
         # return elements
@@ -301,6 +479,7 @@ class HyperNetXWrapper:
                                                                                              x['Kind'] == 'SetIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_class_by_name(self, class_name) -> pd.DataFrame:
         # elements = self.get_outbound_classes().query('edges == "' + class_name + '"')
         # return elements
@@ -313,58 +492,100 @@ class HyperNetXWrapper:
                                                                                              x['Kind'] == 'ClassIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_sets(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'SetIncidence')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'SetIncidence')]
             return outbounds
 
+    @memoized
     def get_outbound_classes(self) -> pd.DataFrame:
         incidences = self.get_incidences()
         if incidences.empty:
             return incidences
         else:
-            outbounds = incidences[incidences["misc_properties"].apply(lambda x: x['Direction'] == 'Outbound' and
-                                                                                 x['Kind'] == 'ClassIncidence')]
+            kinds = self.get_incidence_kinds()
+            outbounds = incidences[(kinds["Direction"] == 'Outbound') & (kinds["Kind"] == 'ClassIncidence')]
             return outbounds
 
-    def get_transitive_firstLevels(self, edge_list: list[str], visited: list[str] = None) -> list[str]:
+    def get_transitive_firstLevels(self, edge_list: list[str]) -> list[str]:
         """
         Given some edges, returns the list of first levels containing them, following nested structs and sets.
         :param edge_list: List of edges to find
-        :param visited: Visited edges to avoid potential recursion (which should not happen)
         :return: List of first levels containing the given edges
         """
-        if visited is None:
-            visited = edge_list
-        else:
-            visited = visited + edge_list
-        firstLevels = []
-        next_edge_list = []
-        hops = pd.merge(pd.concat([self.get_outbound_sets(), self.get_outbound_structs()]).reset_index(level="edges", drop=False), self.get_inbounds()[self.get_inbounds().index.get_level_values("edges").isin(edge_list)].reset_index(level="edges", drop=False), on='nodes', how='inner', suffixes=('_parent', '_child'))
-        for edge_name in edge_list:
-            parents = hops.query(f"edges_child == '{edge_name}'")["edges_parent"]
-            if parents.empty:
-                # It may happen that some classes are not actually present in the design (because of generalizations)
-                if self.is_set(edge_name):
-                    firstLevels.append(edge_name)
-            else:
-                next_edge_list.extend([edge for edge in parents.to_list() if edge not in visited])
-        if next_edge_list:
-            firstLevels.extend(self.get_transitive_firstLevels(next_edge_list, visited))
-        return firstLevels
+        # First levels of all edges are resolved at once, so that edges are just looked up
+        firstlevels_by_edge = self.get_firstlevels_by_edge_name()
+        return drop_duplicates([first_level for edge_name in edge_list for first_level in firstlevels_by_edge.get(edge_name, [])])
 
-    def get_atoms_including_transitivity_by_edge_name(self, edge_name, visited: list[str] = None) -> list[str]:
-        if visited is None:
-            visited = [edge_name]
-        else:
-            visited.append(edge_name)
+    @memoized
+    def get_firstlevels_by_edge_name(self) -> dict[str, list[str]]:
+        """
+        Resolves at once the first levels containing every edge (following nested structs and sets), instead of navigating them edge by edge.
+        :return: Dictionary with the sorted list of first levels containing every edge (edges not in any first level are not included)
+        """
+        if self.get_incidences().empty:
+            return {}
+        hops = pd.merge(pd.concat([self.get_outbound_sets(), self.get_outbound_structs()]).reset_index(level="edges", drop=False), self.get_inbounds().reset_index(level="edges", drop=False), on='nodes', how='inner', suffixes=('_parent', '_child'))
+        parents_by_edge = {}
+        for child_name, parent_name in zip(hops["edges_child"], hops["edges_parent"]):
+            parents_by_edge.setdefault(child_name, []).append(parent_name)
+        set_names = set(self.get_sets().index)
+        firstlevels_by_edge = {}
+        for edge_name in set(parents_by_edge) | set_names:
+            firstlevels = set()
+            visited = {edge_name}
+            pending = [edge_name]
+            while pending:
+                current_name = pending.pop()
+                if current_name in parents_by_edge:
+                    for parent_name in parents_by_edge[current_name]:
+                        if parent_name not in visited:
+                            visited.add(parent_name)
+                            pending.append(parent_name)
+                # It may happen that some classes are not actually present in the design (because of generalizations)
+                elif current_name in set_names:
+                    firstlevels.add(current_name)
+            if firstlevels:
+                firstlevels_by_edge[edge_name] = sorted(firstlevels)
+        return firstlevels_by_edge
+
+    @memoized
+    def get_firstlevels_by_atom_name(self) -> dict[str, list[str]]:
+        """
+        Inverted index of the atoms (i.e., attributes, classes and associations) inside every first level, including
+        transitivity, so that the tables containing an atom can be found without scanning all of them for every query.
+        :return: Dictionary with the sorted list of first levels containing every atom
+        """
+        firstlevels_by_atom = {}
+        first_levels = set(first_level for first_levels in self.get_firstlevels_by_edge_name().values() for first_level in first_levels)
+        for set_name in sorted(first_levels):
+            for atom_name in set(self.get_atoms_including_transitivity_by_edge_name(set_name)):
+                firstlevels_by_atom.setdefault(atom_name, []).append(set_name)
+        return firstlevels_by_atom
+
+    @memoized
+    def get_atoms_including_transitivity_by_edge_name(self, edge_name) -> list[str]:
+        """
+        Gives the atoms (i.e., attributes, class phantoms and association phantoms) inside an edge, following nested structs and sets.
+        :param edge_name: Name of the struct or set
+        :return: List of atoms in depth-first order
+        """
+        outbound_nodes = self.get_outbound_node_names_by_edge_name()
         atom_names = []
-        for node_name in self.get_outbounds().query('edges == "' + edge_name + '"').index.get_level_values("nodes"):
-            if self.is_attribute(node_name) or self.is_class_phantom(node_name) or self.is_association_phantom(node_name):
+        # Depth-first traversal with a stack of the nodes pending in every edge, and the path of edges to detect cycles
+        path = [edge_name]
+        pending = [iter(outbound_nodes.get(edge_name, []))]
+        while pending:
+            node_name = next(pending[-1], None)
+            if node_name is None:
+                pending.pop()
+                path.pop()
+            elif self.is_attribute(node_name) or self.is_class_phantom(node_name) or self.is_association_phantom(node_name):
                 atom_names.append(node_name)
             elif self.is_generalization_phantom(node_name):
                 pass
@@ -373,56 +594,80 @@ class HyperNetXWrapper:
                 assert self.is_phantom(node_name), f"Node '{node_name}' is expected to be a phantom"
                 next_edge = self.get_edge_by_phantom_name(node_name)
                 assert self.is_struct(next_edge) or self.is_set(next_edge), f"Edge '{next_edge}' is expected to be either a struct or a set"
-                assert next_edge not in visited, f"☠️ Cycle of edges detected: {next_edge} already in {visited}"
-                atom_names.extend(self.get_atoms_including_transitivity_by_edge_name(next_edge, visited))
-        visited.pop()
+                assert next_edge not in path, f"☠️ Cycle of edges detected: {next_edge} already in {path}"
+                path.append(next_edge)
+                pending.append(iter(outbound_nodes.get(next_edge, [])))
         return atom_names
 
+    @memoized
     def get_inbound_firstLevel(self) -> pd.DataFrame:
-        firstLevel_phantoms = df_difference(pd.concat([self.get_phantom_structs(), self.get_phantom_sets()], ignore_index=False).reset_index()[["nodes"]],
-                                           self.get_outbounds().reset_index()[["nodes"]])
-        firstLevel_incidences = self.get_inbounds().join(firstLevel_phantoms.set_index("nodes"), on="nodes", how='inner')
+        # Phantoms of structs and sets that are not inside any other edge
+        nested_phantoms = set(self.get_outbounds().index.get_level_values("nodes"))
+        firstLevel_phantoms = [phantom_name for phantom_name in pd.concat([self.get_phantom_structs(), self.get_phantom_sets()]).index if phantom_name not in nested_phantoms]
+        inbounds = self.get_inbounds()
+        firstLevel_incidences = inbounds[inbounds.index.get_level_values("nodes").isin(firstLevel_phantoms)]
         return firstLevel_incidences
 
+    @memoized
     def get_anchor_associations_by_struct_name(self, struct_name) -> list[str]:
         elements = self.get_outbound_struct_by_name(struct_name)
-        anchor_elements = elements[elements["misc_properties"].apply(lambda x: x['Anchor'])]
-        inbounds = self.get_inbound_associations()
-        inbounds["edges"] = inbounds.index.get_level_values("edges")
-        anchor_associations = pd.merge(anchor_elements, inbounds, on="nodes", how="inner")["edges"].to_list()
+        anchor_elements = elements.loc[[properties['Anchor'] for properties in elements["misc_properties"]]]
+        # Every association phantom has a single inbound incidence, which is its own edge
+        anchor_associations = [self.get_edge_by_phantom_name(node_name) for node_name in anchor_elements.index.get_level_values("nodes") if self.is_association_phantom(node_name)]
         return anchor_associations
 
+    @memoized
     def get_anchor_points_by_struct_name(self, struct_name) -> list[str]:
         # This is not considering that an anchor of a struct can be in a nested struct (only at first level)
         elements = self.get_outbound_struct_by_name(struct_name)
-        elements = elements[elements["misc_properties"].apply(lambda x: x['Anchor'])]
+        elements = elements.loc[[properties['Anchor'] for properties in elements["misc_properties"]]]
         inbounds = self.get_inbound_associations()
         inbounds["edges"] = inbounds.index.get_level_values("edges")
         associations = pd.merge(elements, inbounds, on="nodes", suffixes=("_elements", "_inbounds"), how='inner')
         outbounds = self.get_outbound_associations()
         outbounds["nodes"] = outbounds.index.get_level_values("nodes")
         loose_ends = pd.merge(associations, outbounds, on="edges", suffixes=("_associations", "_outbounds"), how='inner').groupby("nodes").filter(lambda x: len(x) == 1)["nodes"].to_list()
-        classes = pd.merge(elements, self.get_inbound_classes(), on="nodes", suffixes=("_elements", "_classes"), how='inner').index.to_list()
+        classes = [node_name for node_name in elements.index.get_level_values("nodes") if self.is_class_phantom(node_name)]
         anchor_points = drop_duplicates(loose_ends+classes)
         return anchor_points
 
+    @memoized
     def get_anchor_end_names_by_struct_name(self, struct_name) -> list[str]:
         elements = self.get_outbound_struct_by_name(struct_name)
-        elements = elements[elements["misc_properties"].apply(lambda x: x['Anchor'])]
+        elements = elements.loc[[properties['Anchor'] for properties in elements["misc_properties"]]]
         inbounds = self.get_inbound_associations()
         inbounds["edges"] = inbounds.index.get_level_values("edges")
         associations = pd.merge(elements, inbounds, on="nodes", suffixes=("_elements", "_inbounds"), how='inner')
         outbounds = self.get_outbound_associations()
         outbounds["nodes"] = outbounds.index.get_level_values("nodes")
         association_ends = pd.merge(associations, outbounds, on="edges", suffixes=("_associations", "_outbounds"), how='inner').groupby("nodes").filter(lambda x: len(x) == 1)
-        classes = pd.merge(elements, self.get_inbound_classes(), on="nodes", suffixes=("_elements", "_classes"), how='inner')
-        loose_ends = association_ends[~association_ends["nodes"].isin(classes.index)]
+        classes = [node_name for node_name in elements.index.get_level_values("nodes") if self.is_class_phantom(node_name)]
+        loose_ends = association_ends[~association_ends["nodes"].isin(classes)]
         if loose_ends.empty:
-            return classes.index.to_list()
+            return classes
         else:
-            end_names = loose_ends.apply(lambda x: str(x.get("misc_properties").get("End_name")), axis=1).to_list()
-            return classes.index.to_list()+end_names
+            end_names = [str(properties.get("End_name")) for properties in loose_ends["misc_properties"]]
+            return classes+end_names
 
+    @memoized
+    def get_bound_association_ends_by_struct_name(self, struct_name) -> list[tuple[str, str]]:
+        """
+        Finds the ends of associations in a struct (including nested ones) whose class is also in it (i.e., not loose ends).
+        :param struct_name: Name of the struct
+        :return: List of pairs with the name of the association end and the phantom of its class
+        """
+        atoms = self.get_atoms_including_transitivity_by_edge_name(struct_name)
+        inbound_associations = self.get_inbound_associations()
+        inbound_classes = self.get_inbound_classes()
+        outbound_associations = self.get_outbound_associations()
+        associations = inbound_associations[inbound_associations.index.get_level_values("nodes").isin(atoms)]
+        classes = inbound_classes[inbound_classes.index.get_level_values("nodes").isin(atoms)]
+        association_ends = outbound_associations[
+            (outbound_associations.index.get_level_values("edges").isin(associations.index.get_level_values("edges"))) &
+            (outbound_associations.index.get_level_values("nodes").isin(classes.index.get_level_values("nodes")))]
+        return [(end_properties["End_name"], end_phantom) for end_phantom, end_properties in zip(association_ends.index.get_level_values("nodes"), association_ends["misc_properties"])]
+
+    @memoized
     def get_loose_association_end_names_by_struct_name(self, struct_name) -> list[str]:
         elements = self.get_outbound_struct_by_name(struct_name)
         inbounds = self.get_inbound_associations()
@@ -431,7 +676,7 @@ class HyperNetXWrapper:
         outbounds = self.get_outbound_associations()
         outbounds["nodes"] = outbounds.index.get_level_values("nodes")
         association_ends = pd.merge(associations, outbounds, on="edges", suffixes=("_associations", "_outbounds"), how='inner').groupby("nodes").filter(lambda x: len(x) == 1)
-        classes = pd.merge(elements, self.get_inbound_classes(), on="nodes", suffixes=("_elements", "_classes"), how='inner')
+        classes = [node_name for node_name in elements.index.get_level_values("nodes") if self.is_class_phantom(node_name)]
         tight_ends = []
         for elem_phantom_name in elements.index.get_level_values("nodes"):
             if self.is_struct_phantom(elem_phantom_name):
@@ -444,15 +689,15 @@ class HyperNetXWrapper:
                 else:
                     tight_ends.append(hop_elem_phantom_name)
         superclass_phantoms = []
-        for class_phantom_name in classes.index.to_list():
+        for class_phantom_name in classes:
             superclass_phantoms.extend(self.get_superclasses_by_class_name(self.get_edge_by_phantom_name(class_phantom_name)))
         superclasses = [self.get_phantom_of_edge_by_name(p) for p in superclass_phantoms]
-        loose_ends = association_ends[~association_ends["nodes"].isin(classes.index.to_list()+superclasses+tight_ends)]
+        loose_ends = association_ends[~association_ends["nodes"].isin(classes+superclasses+tight_ends)]
 
         if loose_ends.empty:
             return []
         else:
-            end_names = loose_ends.apply(lambda x: str(x.get("misc_properties").get("End_name")), axis=1).to_list()
+            end_names = [str(properties.get("End_name")) for properties in loose_ends["misc_properties"]]
             return end_names
 
     def get_restricted_struct_hypergraph(self, struct_name, only_anchor=False) -> Self:
@@ -475,119 +720,142 @@ class HyperNetXWrapper:
             if attr_name not in outbounds:
                 to_be_removed.append(attr_name)
         result.H.remove_nodes(to_be_removed, inplace=True)
+        result.invalidate_cache()
         return result
 
+    @memoized
+    def get_struct_bipartite_by_struct_name(self, struct_name) -> nx.Graph:
+        """
+        Bipartite graph of the restricted struct without the associations in its anchor, which cannot be crossed by the
+        paths from the anchor to the rest of elements. The same graph is traversed by many checks, so it is built only once.
+        The graph is shared by all callers, so it must not be modified.
+        :param struct_name: Name of the struct
+        :return: Bipartite graph of the struct without the associations in the anchor
+        """
+        restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
+        return restricted_struct.H.remove_edges(self.get_anchor_associations_by_struct_name(struct_name)).bipartite()
+
+    @memoized
     def get_attribute_names_by_struct_name(self, struct_name) -> list[str]:
-        return pd.merge(self.get_outbound_struct_by_name(struct_name), self.get_attributes(), on="nodes", how="inner").index.to_list()
+        return [node_name for node_name in self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes") if self.is_attribute(node_name)]
 
-    def get_subclasses_by_class_name(self, class_name, visited: list[str] = None) -> list[str]:
+    @memoized
+    def get_generalization_links_index(self) -> (dict[str, list[str]], dict[str, tuple[str, str]]):
         """
-        Gives the names of the subclasses of a given class (the class itself is not included in the list)
-        :param class_name:
-        :param visited: This is necessary for recursion purposes. Initially, it should be just an empty list
-        :return: List of subclasses (no sorting can be assumed)
+        Direct links of the generalization hierarchy between class phantoms, so that it can be traversed without merging
+        subclasses and superclasses at every step.
+        :return: Dictionary with the list of phantoms of direct subclasses of every class phantom (in the order of the generalizations)
+        :return: Dictionary with the generalization and the phantom of the direct superclass of every class phantom (if any)
         """
-        if visited is None:
-            visited = []
         all_links = self.get_outbound_generalization_superclasses().reset_index(level="nodes", drop=False).merge(
             self.get_outbound_generalization_subclasses().reset_index(level="nodes", drop=False), on="edges",
             suffixes=("_superclass", "_subclass"), how="inner")
-        direct_subclasses = all_links[all_links["nodes_superclass"] == self.get_phantom_of_edge_by_name(class_name)]
-        if direct_subclasses.empty:
-            return []
-        else:
-            subclasses = []
-            for subclass_phantom in direct_subclasses["nodes_subclass"]:
-                subclass = self.get_edge_by_phantom_name(subclass_phantom)
-                assert subclass not in visited, f"☠️ Generalization cycle found for '{subclass}' in '{visited}'"
-                subclasses.extend([subclass]+self.get_subclasses_by_class_name(subclass, visited + [class_name]))
-            return subclasses
-
-    def get_superclasses_by_class_name(self, class_name, visited: list[str] = None) -> list[str]:
+        subclass_links, superclass_links = {}, {}
+        for generalization, superclass_phantom, subclass_phantom in zip(all_links.index, all_links["nodes_superclass"], all_links["nodes_subclass"]):
+            subclass_links.setdefault(superclass_phantom, []).append(subclass_phantom)
+            # Multiple-inheritance is not allowed, so only the first superclass is considered
+            superclass_links.setdefault(subclass_phantom, (generalization, superclass_phantom))
+        return subclass_links, superclass_links
+
+    @memoized
+    def get_subclasses_by_class_name(self, class_name) -> list[str]:
+        """
+        Gives the names of the subclasses of a given class (the class itself is not included in the list)
+        :param class_name:
+        :return: List of subclasses (no sorting can be assumed)
+        """
+        subclass_links, _ = self.get_generalization_links_index()
+        subclasses = []
+        # Depth-first traversal with an explicit stack, keeping the path of superclasses to detect cycles
+        pending = [(subclass_phantom, [class_name]) for subclass_phantom in reversed(subclass_links.get(self.get_phantom_of_edge_by_name(class_name), []))]
+        while pending:
+            subclass_phantom, path = pending.pop()
+            subclass = self.get_edge_by_phantom_name(subclass_phantom)
+            assert subclass not in path, f"☠️ Generalization cycle found for '{subclass}' in '{path}'"
+            subclasses.append(subclass)
+            pending.extend([(next_phantom, path + [subclass]) for next_phantom in reversed(subclass_links.get(subclass_phantom, []))])
+        return subclasses
+
+    @memoized
+    def get_superclasses_by_class_name(self, class_name) -> list[str]:
         """
         Gives the names of the superclasses of a given class (the class itself is not included in the list)
         :param class_name:
-        :param visited: This is necessary for recursion purposes. Initially, it should be just an empty list
         :return: List of superclasses sorted from the bottom top of the hierarchy to the top
         """
-        if visited is None:
-            visited = []
-        all_links = self.get_outbound_generalization_superclasses().reset_index(level="nodes", drop=False).merge(
-            self.get_outbound_generalization_subclasses().reset_index(level="nodes", drop=False), on="edges",
-            suffixes=("_superclass", "_subclass"), how="inner")
-        direct_superclass = all_links[all_links["nodes_subclass"] == self.get_phantom_of_edge_by_name(class_name)]
-        if direct_superclass.empty:
-            return []
-        else:
-            # This means there is one superclass (multiple-inheritance is not allowed)
-            superclass = self.get_edge_by_phantom_name(direct_superclass.iloc[0]["nodes_superclass"])
-            assert superclass not in visited, f"☠️ Generalization cycle found for '{superclass}' in '{visited}'"
-            return [superclass]+self.get_superclasses_by_class_name(superclass, visited + [class_name])
+        return [superclass for _, superclass in self.get_hierarchy_links_by_class_name(class_name)]
 
-    def get_generalizations_by_class_name(self, class_name, visited: list[str] = None) -> list[str]:
-        if visited is None:
-            visited = []
-        all_links = self.get_outbound_generalization_superclasses().reset_index(level="nodes", drop=False).merge(
-            self.get_outbound_generalization_subclasses().reset_index(level="nodes", drop=False), on="edges",
-            suffixes=("_superclass", "_subclass"), how="inner")
-        direct_superclass = all_links[all_links["nodes_subclass"] == self.get_phantom_of_edge_by_name(class_name)]
-        if direct_superclass.empty:
-            return []
-        else:
-            # This means there is one superclass (multiple-inheritance is not allowed)
-            superclass = self.get_edge_by_phantom_name(direct_superclass.iloc[0]["nodes_superclass"])
-            generalization = direct_superclass.index[0]
+    @memoized
+    def get_generalizations_by_class_name(self, class_name) -> list[str]:
+        return [generalization for generalization, _ in self.get_hierarchy_links_by_class_name(class_name)]
+
+    def get_hierarchy_links_by_class_name(self, class_name) -> list[tuple[str, str]]:
+        """
+        Follows the hierarchy of a class bottom-up.
+        :param class_name:
+        :return: List of pairs of generalization and superclass from the bottom of the hierarchy to the top
+        """
+        _, superclass_links = self.get_generalization_links_index()
+        hierarchy_links = []
+        visited = [class_name]
+        current_phantom = self.get_phantom_of_edge_by_name(class_name)
+        while current_phantom in superclass_links:
+            generalization, current_phantom = superclass_links[current_phantom]
+            superclass = self.get_edge_by_phantom_name(current_phantom)
             assert superclass not in visited, f"☠️ Generalization cycle found for '{superclass}' in '{visited}'"
-            return [generalization]+self.get_generalizations_by_class_name(superclass, visited + [class_name])
+            hierarchy_links.append((generalization, superclass))
+            visited.append(superclass)
+        return hierarchy_links
 
+    @memoized
     def get_discriminant_by_class_name(self, class_name) -> str:
         return self.get_outbound_generalization_subclasses().reset_index(level="edges", drop=True).loc[
             self.get_phantom_of_edge_by_name(class_name)].misc_properties.get("Constraint", None)
 
     def is_attribute(self, name) -> bool:
-        return name in self.get_attributes().index.to_list()
+        return self.get_node_kind_index().get(name) == 'Attribute'
 
     def is_association_end(self, name) -> bool:
-        return name in self.get_association_ends().index.to_list()
+        return name in self.get_association_end_names()
 
     def is_id(self, name) -> bool:
-        return name in self.get_ids().index.to_list()
+        return name in self.get_id_names()
 
     def is_class(self, name) -> bool:
-        return name in self.get_classes().index.to_list()
+        return self.get_edge_kind_index().get(name) == 'Class'
 
     def is_phantom(self, name) -> bool:
-        return name in self.get_phantoms().index.to_list()
+        return name in self.get_phantom_subkind_index()
 
     def is_class_phantom(self, name) -> bool:
-        return name in self.get_phantom_classes().index.to_list()
+        return self.get_phantom_subkind_index().get(name) == 'Class'
 
     def is_association_phantom(self, name) -> bool:
-        return name in self.get_phantom_associations().index.to_list()
+        return self.get_phantom_subkind_index().get(name) == 'Association'
 
     def is_generalization_phantom(self, name) -> bool:
-        return name in self.get_phantom_generalizations().index.to_list()
+        return self.get_phantom_subkind_index().get(name) == 'Generalization'
 
     def is_struct_phantom(self, name) -> bool:
-        return name in self.get_phantom_structs().index.to_list()
+        return self.get_phantom_subkind_index().get(name) == 'Struct'
 
     def is_set_phantom(self, name) -> bool:
-        return name in self.get_phantom_sets().index.to_list()
+        return self.get_phantom_subkind_index().get(name) == 'Set'
 
     def is_edge(self, name) -> bool:
-        return name in self.get_edges().index.to_list()
+        return name in self.get_edge_kind_index()
 
     def is_association(self, name) -> bool:
-        return name in self.get_associations().index.to_list()
+        return self.get_edge_kind_index().get(name) == 'Association'
 
     def is_generalization(self, name) -> bool:
-        return name in self.get_generalizations().index.to_list()
+        return self.get_edge_kind_index().get(name) == 'Generalization'
 
     def is_struct(self, name) -> bool:
-        return name in self.get_structs().index.to_list()
+        return self.get_edge_kind_index().get(name) == 'Struct'
 
     def is_set(self, name) -> bool:
-        return name in self.get_sets().index.to_list()
+        return self.get_edge_kind_index().get(name) == 'Set'
 
     def has_cycle(self, edge_name, visited: list[str] = None) -> bool:
         if visited is None:
@@ -595,14 +863,14 @@ class HyperNetXWrapper:
         else:
             visited.append(edge_name)
         cyclic = False
-        for node_name in self.get_outbounds().query('edges == "' + edge_name + '"').index.get_level_values("nodes"):
+        for node_name in self.get_outbound_node_names_by_edge_name().get(edge_name, []):
             if self.is_phantom(node_name):
                 next_edge = self.get_edge_by_phantom_name(node_name)
                 if self.is_struct(next_edge) or self.is_set(next_edge):
-                    if next_edge in visited:
+                    # Once a cycle is found, the rest of the elements do not need to be explored
+                    if next_edge in visited or self.has_cycle(next_edge, visited):
                         cyclic = True
-                    else:
-                        cyclic = cyclic or self.has_cycle(next_edge, visited)
+                        break
         visited.pop()
         return cyclic
 
@@ -614,25 +882,33 @@ class HyperNetXWrapper:
         :return: Boolean indicating if the path is at least to-one.
         :return: Boolean indicating if the path is at most to-one.
         """
-        correct = (True, True)
+        at_least_one, at_most_one = True, True
+        # Kinds of the elements and ends of the associations are taken from precomputed indexes, so that every step is a lookup
+        edge_kinds = self.get_edge_kind_index()
+        ends_ahead_index = self.get_association_ends_ahead_index()
         for i, current in enumerate(path):
-            if self.is_association(current) or self.is_generalization(current):
+            # Once both conditions are violated, the rest of the path cannot change the result
+            if not at_least_one and not at_most_one:
+                break
+            current_kind = edge_kinds.get(current)
+            if current_kind in ("Association", "Generalization"):
                 assert i > 0, f"☠️ Path '{path}' cannot start with a relationship"
                 assert i < len(path)-1, f"☠️ Path '{path}' cannot end with a relationship"
                 assert self.is_phantom(path[i-1]) and self.is_phantom(path[i+1]), f"☠️ Path '{path}' must alternate relationships and phantoms"
-            if self.is_association(current):
-                ends_ahead = self.get_association_ends_by_name(current).query('nodes != "' + path[i-1] + '"')
-                assert ends_ahead.shape[0] == 1, f"☠️ Unexpected multiple association ends ahead in association '{current}' of path '{path}'"
-                properties = ends_ahead.iloc[0].misc_properties
-                assert "MultiplicityMin" in properties, f"☠️ MultiplicityMin not provided for association end '{ends_ahead.iloc[0].name}'"
-                assert "MultiplicityMax" in properties, f"☠️ MultiplicityMax not provided for association end '{ends_ahead.iloc[0].name}'"
-                correct = (correct[0] and (properties.get("MultiplicityMin") >= 1), correct[1] and (properties.get("MultiplicityMax") <= 1))
+            if current_kind == "Association":
+                ends_ahead = ends_ahead_index.get((current, path[i-1]), [])
+                assert len(ends_ahead) == 1, f"☠️ Unexpected multiple association ends ahead in association '{current}' of path '{path}'"
+                end_name, properties = ends_ahead[0]
+                assert "MultiplicityMin" in properties, f"☠️ MultiplicityMin not provided for association end '{end_name}'"
+                assert "MultiplicityMax" in properties, f"☠️ MultiplicityMax not provided for association end '{end_name}'"
+                at_least_one = at_least_one and properties["MultiplicityMin"] >= 1
+                at_most_one = at_most_one and properties["MultiplicityMax"] <= 1
             # If it is not an association it still can be a generalization
-            elif self.is_generalization(current):
+            elif current_kind == "Generalization":
                 # Max is always to-one independently of the direction
-                # Min is also to-one if it goes upward, but less than one if it goes downwards
-                correct = (correct[0] and (self.get_edge_by_phantom_name(path[i+1]) in self.get_superclasses_by_class_name(self.get_edge_by_phantom_name(path[i-1]))), correct[1])
-        return correct
+                # Min is also to-one if it goes upward, but less than one if it goes downwards (only checked if still needed)
+                at_least_one = at_least_one and self.get_edge_by_phantom_name(path[i+1]) in self.get_superclasses_by_class_name(self.get_edge_by_phantom_name(path[i-1]))
+        return at_least_one, at_most_one
 
     def exists_more_generic_struct_in_set(self, struct_name, set_name) -> bool:
         found = False
@@ -640,7 +916,8 @@ class HyperNetXWrapper:
         for key in self.get_anchor_end_names_by_struct_name(struct_name):
             if self.is_class_phantom(key):
                 struct_anchor_classes.append(self.get_edge_by_phantom_name(key))
-        struct_phantom_list = pd.merge(self.get_outbound_set_by_name(set_name), self.get_phantom_structs(), on="nodes", how="inner").index
+        set_nodes = self.get_outbound_set_by_name(set_name).index.get_level_values("nodes")
+        struct_phantom_list = set_nodes[set_nodes.isin(self.get_phantom_structs().index)]
         for current_struct_phantom in struct_phantom_list:
             current_struct_name = self.get_edge_by_phantom_name(current_struct_phantom)
             if current_struct_name != struct_name:
@@ -651,18 +928,18 @@ class HyperNetXWrapper:
                 for anchor in struct_anchor_classes:
                     for current_anchor in current_struct_anchor_classes:
                         if anchor != current_anchor:
-                            superclasses = self.get_superclasses_by_class_name(anchor)
-                            found = found or (current_anchor in superclasses)
+                            if current_anchor in self.get_superclasses_by_class_name(anchor):
+                                return True
         return found
 
     def show_textual(self) -> None:
         # Textual display
         print("-----------------------------------------------Nodes: ")
-        display(self.H.nodes.dataframe)
+        custom_display(self.H.nodes.dataframe)
         print("-----------------------------------------------Edges: ")
-        display(self.H.edges.dataframe)
+        custom_display(self.H.edges.dataframe)
         print("------------------------------------------Incidences: ")
-        display(self.H.incidences.dataframe)
+        custom_display(self.H.incidences.dataframe)
 
     def show_graphical(self) -> None:
         # Customize node graphical display
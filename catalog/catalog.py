@@ -2,27 +2,55 @@ from abc import abstractmethod
 import logging
 import warnings
 import json
+import functools
+import re
 import networkx as nx
-from IPython.display import display
 import pandas as pd
 import sqlparse
 from pathlib import Path
 from tqdm import tqdm
 
 from . import config
-from .tools import custom_warning, custom_progress, combine_buckets, drop_duplicates, df_difference, extract_up_to_folder
+from .tools import custom_warning, custom_progress, custom_display, combine_buckets, drop_duplicates, df_difference, extract_up_to_folder, find_simple_paths, memoized
 from .HyperNetXWrapper import HyperNetXWrapper
 from .XML2JSON.domain.DomainTranslator import translate as translate_domain
 from .XML2JSON.design.DesignTranslator import translate as translate_design
 
-# Libraries initialization
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', 1000)
-
 logger = logging.getLogger("Catalog")
 warnings.showwarning = custom_warning
 
 
+# Comparisons between attributes and constants (i.e., numbers, strings or parameters), which is the usual case in filters
+COMPARISON_PATTERN = re.compile(r"([A-Za-z_]\w*)\s*(?:=|<>|!=|<=|>=|<|>)\s*(?:([A-Za-z_]\w*)|-?\d+(?:\.\d+)?|'[^']*'|\$\d+)")
+SIMPLE_PREDICATE_PATTERN = re.compile(r"\s*{0}(?:\s+(?:AND|OR)\s+{0})*\s*".format(COMPARISON_PATTERN.pattern), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=256)
+def extract_predicate_names(predicate) -> tuple[str, ...]:
+    '''
+    Parses a predicate to get the names used in its clauses.
+    Parsing only depends on the text of the predicate, so the same filters and constraints are parsed only once.
+    Simple predicates (i.e., comparisons combined with AND/OR) are scanned with a regular expression, and only the
+    rest are actually parsed with sqlparse.
+    :param predicate: Predicate as it would appear in a WHERE clause (without the keyword)
+    :return: Tuple with the names in the predicate (in order of appearance)
+    '''
+    if SIMPLE_PREDICATE_PATTERN.fullmatch(predicate):
+        names = tuple(name for comparison in COMPARISON_PATTERN.finditer(predicate) for name in comparison.groups() if name is not None)
+        # Keywords (e.g., NULL) are not names for sqlparse, so they are left to it
+        if not any(name.upper() in sqlparse.keywords.KEYWORDS or name.upper() in sqlparse.keywords.KEYWORDS_COMMON for name in names):
+            return names
+    names = []
+    where_parsed = sqlparse.parse("WHERE "+predicate)[0].tokens[0]
+    # TODO: Parenthesis are not considered by now. It will require some kind of recursion
+    for atom in where_parsed.tokens:
+        if atom.ttype is None:  # This is a clause in the predicate
+            for token in atom.tokens:
+                if token.ttype is None:  # This is an attribute in the predicate
+                    names.append(token.value)
+    return tuple(names)
+
+
 class Catalog(HyperNetXWrapper):
     """This class contains the main generic operations to build the catalog of a database using hypergraphs.
     It uses HyperNetX (https://github.com/pnnl/HyperNetX).
@@ -46,7 +74,7 @@ class Catalog(HyperNetXWrapper):
         The latter is another dictionary that can contain any key, but at least it should contain
         'DataType' (string), 'Size' (numeric), 'DistinctVals' (numeric).
         """
-        logger.info("Adding class "+class_name)
+        logger.info("Adding class %s", class_name)
         if self.is_attribute(class_name) or self.is_association_end(class_name) or self.is_edge(class_name):
             raise ValueError(f"🚨 Some element called '{class_name}' already exists")
         # First element in the pair is the name and the second its properties
@@ -80,6 +108,7 @@ class Catalog(HyperNetXWrapper):
         self.H.add_nodes_from(nodes)
         self.H.add_edges_from(edges)
         self.H.add_incidences_from(incidences)
+        self.invalidate_cache()
 
     def add_association(self, association_name, ends_list) -> None:
         """Besides the association name, this method requires
@@ -87,7 +116,7 @@ class Catalog(HyperNetXWrapper):
         The latter is another dictionary that contains
         'DataType' (string), 'Size' (numeric), 'DistinctVals' (numeric).
         """
-        logger.info("Adding association "+association_name)
+        logger.info("Adding association %s", association_name)
         if self.is_attribute(association_name) or self.is_association_end(association_name) or self.is_edge(association_name):
             raise ValueError(f"🚨 The element '{association_name}' already exists")
         if len(ends_list) != 2:
@@ -95,6 +124,7 @@ class Catalog(HyperNetXWrapper):
         self.H.add_edge(association_name, Kind='Association')
         # This adds a special phantom node required to represent different cases of inclusion in structs
         self.H.add_node(self.config.prepend_phantom+association_name, Kind='Phantom', Subkind='Association')
+        self.invalidate_cache()
         # First element in the pair of incidences is the edge name and the second the node
         incidences = [(association_name, self.config.prepend_phantom+association_name, {'Kind': 'AssociationIncidence', 'Direction': 'Inbound'})]
         for end in ends_list:
@@ -111,6 +141,7 @@ class Catalog(HyperNetXWrapper):
             end['prop']['Direction'] = 'Outbound'
             incidences.append((association_name, self.get_phantom_of_edge_by_name(end['class']), end['prop']))
         self.H.add_incidences_from(incidences)
+        self.invalidate_cache()
 
     def add_generalization(self, generalization_name, properties, superclass, subclasses_list) -> None:
         """ Besides the generalization name, this method requires some properties (expected to be two booleans) for
@@ -118,12 +149,13 @@ class Catalog(HyperNetXWrapper):
         where each subclass is a dictionary with the keys 'name' and 'prop'.
         The latter is another dictionary that contains at least one constraint predicate that discriminates the subclass.
         """
-        logger.info("Adding generalization "+generalization_name)
+        logger.info("Adding generalization %s", generalization_name)
         if self.is_attribute(generalization_name) or self.is_association_end(generalization_name) or self.is_edge(generalization_name):
             raise ValueError(f"🚨 The element called '{generalization_name}' already exists")
         self.H.add_edge(generalization_name, Kind='Generalization', Disjoint=properties.get('Disjoint', False), Complete=properties.get('Complete', False))
         # This adds a special phantom node required to represent different cases of inclusion in structs
         self.H.add_node(self.config.prepend_phantom+generalization_name, Kind='Phantom', Subkind='Generalization')
+        self.invalidate_cache()
         # First element in the pair of incidences is the edge name and the second the node
         incidences = [(generalization_name, self.config.prepend_phantom+generalization_name, {'Kind': 'GeneralizationIncidence', 'Direction': 'Inbound'})]
         if not self.is_class(superclass):
@@ -142,9 +174,10 @@ class Catalog(HyperNetXWrapper):
             sub['prop']['Direction'] = 'Outbound'
             incidences.append((generalization_name, self.get_phantom_of_edge_by_name(sub['class']), sub['prop']))
         self.H.add_incidences_from(incidences)
+        self.invalidate_cache()
 
     def add_struct(self, struct_name, anchor, elements) -> None:
-        logger.info("Adding struct "+struct_name)
+        logger.info("Adding struct %s", struct_name)
         if self.is_edge(struct_name):
             raise ValueError(f"🚨 The hyperedge '{struct_name}' already exists")
         if not anchor:
@@ -155,6 +188,7 @@ class Catalog(HyperNetXWrapper):
         self.H.add_edge(struct_name, Kind='Struct')
         # This adds a special phantom node required to represent different cases of inclusion in structs
         self.H.add_node(self.config.prepend_phantom+struct_name, Kind='Phantom', Subkind="Struct")
+        self.invalidate_cache()
         # First element in the pair of incidences is the edge name and the second the node
         incidences = [(struct_name, self.config.prepend_phantom+struct_name, {'Kind': 'StructIncidence', 'Direction': 'Inbound'})]
         for elem in drop_duplicates(elements+anchor):
@@ -172,7 +206,7 @@ class Catalog(HyperNetXWrapper):
                 # Add the identifier to the struct
                 incidences.append((struct_name, self.get_class_id_by_name(elem), {'Kind': 'StructIncidence', 'Direction': 'Outbound', 'Anchor': False}))
                 # We do need to have the generalizations in the struct to generate a restricted struct correctly including superclasses
-                for g in self.get_generalizations_by_class_name(elem, []):
+                for g in self.get_generalizations_by_class_name(elem):
                     incidences.append((struct_name, self.get_phantom_of_edge_by_name(g), {'Kind': 'StructIncidence', 'Direction': 'Outbound', 'Anchor': False}))
             elif self.is_struct(elem) or self.is_set(elem):
                 incidences.append((struct_name, self.get_phantom_of_edge_by_name(elem), {'Kind': 'StructIncidence', 'Direction': 'Outbound', 'Anchor': (elem in anchor)}))
@@ -181,6 +215,7 @@ class Catalog(HyperNetXWrapper):
             else:
                 raise ValueError(f"🚨 Creating struct '{struct_name}' could not find '{elem}' to place it inside (check both domain and design)")
         self.H.add_incidences_from(incidences)
+        self.invalidate_cache()
         # Check if the classes and associations in the struct are connected
         restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
         if not restricted_struct.H.is_connected():
@@ -195,7 +230,7 @@ class Catalog(HyperNetXWrapper):
             raise ValueError(f"🚨 The anchor of struct '{struct_name}' is not connected")
 
     def add_set(self, set_name, elements) -> None:
-        logger.info("Adding set "+set_name)
+        logger.info("Adding set %s", set_name)
         if set_name in self.get_edges()["name"]:
             raise ValueError(f"🚨 The hyperedge '{set_name}' already exists")
         if len(elements) == 0:
@@ -203,6 +238,7 @@ class Catalog(HyperNetXWrapper):
         self.H.add_edge(set_name, Kind='Set')
         # This adds a special phantom node required to represent different cases of inclusion in sets
         self.H.add_node('Phantom_'+set_name, Kind='Phantom', Subkind="Set")
+        self.invalidate_cache()
         # First element in the pair of incidences is the edge name and the second the node
         incidences = [(set_name, self.config.prepend_phantom+set_name, {'Kind': 'SetIncidence', 'Direction': 'Inbound'})]
         for elem in elements:
@@ -217,6 +253,7 @@ class Catalog(HyperNetXWrapper):
             else:
                 raise ValueError(f"🚨 Creating set '{set_name}' could not find the kind of '{elem}' to place it inside (the element may not exist in the domain)")
         self.H.add_incidences_from(incidences)
+        self.invalidate_cache()
 
     def load_domain(self, file_path: Path, file_format="JSON") -> None:
         logger.info(f"Loading domain from '{file_path}'")
@@ -275,8 +312,9 @@ class Catalog(HyperNetXWrapper):
 
         logger.info("Checking the insertion guards")
         # Check insertion guards
-        for guard in tqdm(self.guards.itertuples(), desc="Checking guards", leave=config.show_progress):
-            self.get_insertion_alternatives(guard.pattern, guard.data)
+        # Columns are zipped directly (they do not exist if there are no guards at all)
+        for pattern, data in tqdm(zip(self.guards.get("pattern", []), self.guards.get("data", [])), total=len(self.guards), desc="Checking guards", leave=config.show_progress):
+            self.get_insertion_alternatives(pattern, data)
 
     @staticmethod
     def get_domain_attribute_from_path(attr_path: list[dict[str, str]]) -> str:
@@ -301,6 +339,7 @@ class Catalog(HyperNetXWrapper):
         assert attr_path[-1].get("kind", "") in ["Attribute", "AssociationEnd"], f"☠️ Incorrect attribute path '{attr_path}', whose last hop should be either an Attribute or AssociationEnd"
         return None
 
+    @memoized
     def get_struct_attributes(self, struct_name) -> list[tuple[str, list[dict[str, str]]]]:
         """
         This generates the correspondence between attribute names in a struct and their corresponding attribute.
@@ -317,26 +356,29 @@ class Catalog(HyperNetXWrapper):
         loose_ends = self.get_loose_association_end_names_by_struct_name(struct_name)
         # For each element in the struct
         elem_names = self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes")
-        for elem_name in elem_names:
-            assert self.is_attribute(elem_name) or self.is_class_phantom(elem_name) or self.is_association_phantom(elem_name) or self.is_generalization_phantom(elem_name) or self.is_struct_phantom(elem_name) or self.is_set_phantom(elem_name), f"☠️ Some element in struct '{struct_name}' is not expected: '{elem_name}'"
-            if self.is_attribute(elem_name):
+        # All elements are classified at once (either as attributes or by the subkind of the phantom), instead of checking every kind for each of them
+        elem_kinds = elem_names.map(self.get_phantom_subkind_index()).where(~elem_names.isin(self.get_attributes().index), "Attribute")
+        for elem_name, elem_kind in zip(elem_names, elem_kinds):
+            assert elem_kind in ["Attribute", "Class", "Association", "Generalization", "Struct", "Set"], f"☠️ Some element in struct '{struct_name}' is not expected: '{elem_name}'"
+            if elem_kind == "Attribute":
                 attribute_list.append((elem_name, [{"kind": "Attribute", "name": elem_name}]))
-            elif self.is_class_phantom(elem_name):
+            elif elem_kind == "Class":
                 # Add the class identifier if there is not any other attribute of the same class
                 class_name = self.get_edge_by_phantom_name(elem_name)
                 if not self.get_outbound_class_by_name(class_name).index.get_level_values('nodes').isin(elem_names).any():
-                    attribute_list.append((self.get_class_id_by_name(class_name), [{"kind": "Attribute", "name": self.get_class_id_by_name(class_name)}]))
-            elif self.is_association_phantom(elem_name):
+                    class_id = self.get_class_id_by_name(class_name)
+                    attribute_list.append((class_id, [{"kind": "Attribute", "name": class_id}]))
+            elif elem_kind == "Association":
                 ends = self.get_outbound_association_by_name(self.get_edge_by_phantom_name(elem_name))
-                for end in ends.itertuples():
-                    if end.misc_properties["End_name"] in loose_ends:
-                        attribute_list.append((end.misc_properties['End_name'],
-                                               [{"kind": "AssociationEnd", "name": end.misc_properties['End_name'], "id": self.get_class_id_by_name(self.get_edge_by_phantom_name(end.Index[1]))}]))
-            elif self.is_struct_phantom(elem_name):
+                for end_phantom, end_properties in zip(ends.index.get_level_values("nodes"), ends["misc_properties"]):
+                    if end_properties["End_name"] in loose_ends:
+                        attribute_list.append((end_properties['End_name'],
+                                               [{"kind": "AssociationEnd", "name": end_properties['End_name'], "id": self.get_class_id_by_name(self.get_edge_by_phantom_name(end_phantom))}]))
+            elif elem_kind == "Struct":
                 nested_struct_name = self.get_edge_by_phantom_name(elem_name)
                 for attr_name, attr_path in self.get_struct_attributes(nested_struct_name):
                     attribute_list.append((attr_name, [{"kind": "Struct", "name": nested_struct_name}]+attr_path))
-            elif self.is_set_phantom(elem_name):
+            elif elem_kind == "Set":
                 nested_set_name = self.get_edge_by_phantom_name(elem_name)
                 for nested_element_phantom_name in self.get_outbound_set_by_name(nested_set_name).index.get_level_values("nodes"):
                     assert self.is_class_phantom(nested_element_phantom_name) or self.is_struct_phantom(nested_element_phantom_name), f"☠️ Set '{nested_set_name}' contains '{nested_element_phantom_name}', which is neither a class nor a struct"
@@ -392,7 +434,7 @@ class Catalog(HyperNetXWrapper):
         if not violations1_1[violations1_1 > 1].empty:
             consistent = False
             print("🚨 IC-Generic1 violation: Some names are not unique")
-            display(violations1_1[violations1_1 > 1])
+            custom_display(violations1_1[violations1_1 > 1])
 
         # IC-Generic2: The catalog must be connected
         logger.info("Checking IC-Generic2")
@@ -407,7 +449,7 @@ class Catalog(HyperNetXWrapper):
         if not violations1_3.empty:
             consistent = False
             print("🚨 IC-Generic3 violation: There are phantoms without an edge")
-            display(violations1_3)
+            custom_display(violations1_3)
 
         # IC-Generic4: Every edge has at least one inbound
         logger.info("Checking IC-Generic4")
@@ -416,7 +458,7 @@ class Catalog(HyperNetXWrapper):
         if not violations1_4.empty:
             consistent = False
             print("🚨 IC-Generic4 violation: There are edges without inbound")
-            display(violations1_4)
+            custom_display(violations1_4)
 
         # IC-Generic5: Every edge has at least one outbound
         logger.info("Checking IC-Generic5")
@@ -428,7 +470,7 @@ class Catalog(HyperNetXWrapper):
         if not violations1_5.empty:
             consistent = False
             print("🚨 IC-Generic5 violation: There are edges without outbound (a.k.a. attributes), and they are not specialized classes")
-            display(violations1_5)
+            custom_display(violations1_5)
 
         # IC-Generic6: An edge cannot have more than one inbound
         logger.info("Checking IC-Generic6")
@@ -436,16 +478,16 @@ class Catalog(HyperNetXWrapper):
         if not violations1_6[violations1_6 > 1].empty:
             consistent = False
             print("🚨 IC-Generic6 violation: There are edges with more than one inbound")
-            display(violations1_6[violations1_6 > 1])
+            custom_display(violations1_6[violations1_6 > 1])
 
         # IC-Generic7: A hyperedge cannot be cyclic
         logger.info("Checking IC-Generic7")
         matches1_7 = pd.concat([self.get_sets(), self.get_structs()])
-        violations1_7 = matches1_7[matches1_7.apply(lambda row: self.has_cycle(row["name"]), axis=1)]
+        violations1_7 = matches1_7.loc[[self.has_cycle(edge_name) for edge_name in matches1_7["name"]]]
         if not violations1_7.empty:
             consistent = False
             print("🚨 IC-Generic7 violation: There are cyclic hyperedges")
-            display(violations1_7)
+            custom_display(violations1_7)
 
         # IC-Generic8: Unused
 
@@ -459,7 +501,7 @@ class Catalog(HyperNetXWrapper):
         if not violations2_2.empty:
             consistent = False
             print("🚨 IC-Atoms2 violation: There are IDs without a class")
-            display(violations2_2)
+            custom_display(violations2_2)
 
         # IC-Atoms3: Every attribute must belong at least one class which is outbound
         logger.info("Checking IC-Atoms3")
@@ -468,7 +510,7 @@ class Catalog(HyperNetXWrapper):
         if not violations2_3.empty:
             consistent = False
             print("🚨 IC-Atoms3 violation: There are attributes without a class")
-            display(violations2_3)
+            custom_display(violations2_3)
 
         # IC-Atoms4: An attribute cannot belong to more than one class
         logger.info("Checking IC-Atoms4")
@@ -477,13 +519,13 @@ class Catalog(HyperNetXWrapper):
         if not violations2_4[violations2_4 > 1].empty:
             consistent = False
             print("🚨 IC-Atoms4 violation: There are attributes with more than one class")
-            display(violations2_4[violations2_4 > 1])
+            custom_display(violations2_4[violations2_4 > 1])
 
         # IC-Atoms5_pre: Missing information provided to check consistency of cardinalities
         logger.info("Checking IC-Atoms5_pre")
         matches2_5_pre1 = outbounds.join(classes, on='edges', rsuffix='_class', how='inner')
-        violations2_5_pre1 = matches2_5_pre1[matches2_5_pre1.apply(lambda r: r["misc_properties"]["DistinctVals"] is None, axis=1)]
-        violations2_5_pre2 = classes[classes.apply(lambda r: r["misc_properties"]["Count"] is None, axis=1)]
+        violations2_5_pre1 = matches2_5_pre1.loc[[properties["DistinctVals"] is None for properties in matches2_5_pre1["misc_properties"]]]
+        violations2_5_pre2 = classes.loc[[properties["Count"] is None for properties in classes["misc_properties"]]]
         if not violations2_5_pre2.empty:
             warnings.warn(f"⚠️ IC-Atoms5_pre violation: Cardinalities are missing in classes {list(violations2_5_pre2.index)}")
         if not violations2_5_pre1.empty:
@@ -492,13 +534,14 @@ class Catalog(HyperNetXWrapper):
         # IC-Atoms5: The number of different values of an attribute must be less or equal than the cardinality of its class
         logger.info("Checking IC-Atoms5")
         matches2_5 = outbounds.join(classes, on='edges', rsuffix='_class', how='inner')
-        violations2_5 = matches2_5[matches2_5.apply(lambda r: r["misc_properties"]["DistinctVals"] is not None
-                                                              and r["misc_properties_class"]["Count"] is not None
-                                                              and r["misc_properties"]["DistinctVals"] > r["misc_properties_class"]["Count"], axis=1)]
+        violations2_5 = matches2_5.loc[[properties["DistinctVals"] is not None
+                                        and class_properties["Count"] is not None
+                                        and properties["DistinctVals"] > class_properties["Count"]
+                                        for properties, class_properties in zip(matches2_5["misc_properties"], matches2_5["misc_properties_class"])]]
         if not violations2_5.empty:
             consistent = False
             print("🚨 IC-Atoms5 violation: The number of different values of an attribute is greater than the cardinality of its class")
-            display(violations2_5)
+            custom_display(violations2_5)
 
         # IC-Atoms6: Every association has one phantom
         logger.info("Checking IC-Atoms6")
@@ -507,7 +550,7 @@ class Catalog(HyperNetXWrapper):
         if not violations2_6.empty:
             consistent = False
             print("🚨 IC-Atoms6 violation: There are associations without phantom")
-            display(violations2_6)
+            custom_display(violations2_6)
 
         # IC-Atoms7: Every association has two ends (Definition 4)
         logger.info("Checking IC-Atoms7")
@@ -516,16 +559,17 @@ class Catalog(HyperNetXWrapper):
         if not violations2_7.empty:
             consistent = False
             print("🚨 IC-Atoms7 violation: There are non-binary associations")
-            display(violations2_7)
+            custom_display(violations2_7)
 
         # IC-Atoms8: The number of different values of an identifier must coincide with the cardinality of its class
         logger.info("Checking IC-Atoms8")
         matches2_8 = outbounds.join(classes, on='edges', rsuffix='_class', how='inner')
-        violations2_8 = matches2_8[matches2_8.apply(lambda r: r["misc_properties"]["Identifier"] and r["misc_properties"]["DistinctVals"] != r["misc_properties_class"]["Count"], axis=1)]
+        violations2_8 = matches2_8.loc[[properties["Identifier"] and properties["DistinctVals"] != class_properties["Count"]
+                                        for properties, class_properties in zip(matches2_8["misc_properties"], matches2_8["misc_properties_class"])]]
         if not violations2_8.empty:
             consistent = False
             print("🚨 IC-Atoms5 violation: The number of different values of an identified must coincide with the cardinality of its class")
-            display(violations2_8)
+            custom_display(violations2_8)
 
         # IC-Atoms9: One class cannot have more than one direct superclass
         logger.info("Checking IC-Atoms9")
@@ -534,32 +578,33 @@ class Catalog(HyperNetXWrapper):
         if not violations2_9.empty:
             consistent = False
             print("🚨 IC-Atoms9 violation: There are classes with more than one superclass")
-            display(violations2_9)
+            custom_display(violations2_9)
 
         # IC-Atoms10: Every generalization outgoing of a subclass must have a discriminant
         logger.info("Checking IC-Atoms10")
-        violations2_10 = self.get_outbound_generalization_subclasses()[~self.get_outbound_generalization_subclasses().apply(lambda r: "Constraint" in r["misc_properties"], axis=1)]
+        subclass_incidences = self.get_outbound_generalization_subclasses()
+        violations2_10 = subclass_incidences.loc[["Constraint" not in properties for properties in subclass_incidences["misc_properties"]]]
         if not violations2_10.empty:
             consistent = False
             print("🚨 IC-Atoms10 violation: There are generalization subclasses without discriminant constraint")
-            display(violations2_10)
+            custom_display(violations2_10)
 
         # IC-Atoms11: Every generalization has disjointness and completeness constraints
         logger.info("Checking IC-Atoms11")
-        matches2_11 = generalizations[generalizations.apply(lambda r: "Disjoint" in r["misc_properties"] and "Complete" in r["misc_properties"], axis=1)]
+        matches2_11 = generalizations.loc[["Disjoint" in properties and "Complete" in properties for properties in generalizations["misc_properties"]]]
         violations2_11 = df_difference(generalizations["name"], matches2_11["name"])
         if not violations2_11.empty:
             consistent = False
             print("🚨 IC-Atoms11 violation: There are generalizations without completeness and disjointness constraints")
-            display(violations2_11)
+            custom_display(violations2_11)
 
         # IC-Atoms12: Generalizations cannot have cycles
         logger.info("Checking IC-Atoms12")
-        violations2_12 = classes[classes.apply(lambda r: r["name"] in self.get_superclasses_by_class_name(r["name"]), axis=1)]
+        violations2_12 = classes.loc[[class_name in self.get_superclasses_by_class_name(class_name) for class_name in classes["name"]]]
         if not violations2_12.empty:
             consistent = False
             print("🚨 IC-Atoms12 violation: There are some cyclic generalizations")
-            display(violations2_12)
+            custom_display(violations2_12)
 
         # IC-Atoms13: Every class has one ID or belongs to a generalization hierarchy
         logger.info("Checking IC-Atoms13")
@@ -593,19 +638,21 @@ class Catalog(HyperNetXWrapper):
 
         # IC-Atoms16: Every discriminant must be an attribute in one of the corresponding superclasses
         logger.info("Checking IC-Atoms16")
-        matches2_16 = self.get_outbound_generalization_subclasses()[self.get_outbound_generalization_subclasses().apply(lambda r: "Constraint" in r["misc_properties"], axis=1)]
-        for subclass in matches2_16.itertuples():
-            superclass_names = self.get_superclasses_by_class_name(self.get_edge_by_phantom_name(subclass.Index[1]))
-            constraint = subclass.misc_properties.get('Constraint', None)
-            assert constraint is not None, f"☠️ No constraint found for '{subclass}'"
+        subclass_incidences = self.get_outbound_generalization_subclasses()
+        matches2_16 = subclass_incidences.loc[subclass_incidences["misc_properties"].apply(lambda properties: "Constraint" in properties).astype(bool)]
+        incidence_properties = self.get_incidence_properties_index()
+        for subclass_phantom, subclass_properties in zip(matches2_16.index.get_level_values("nodes"), matches2_16["misc_properties"]):
+            superclass_names = self.get_superclasses_by_class_name(self.get_edge_by_phantom_name(subclass_phantom))
+            constraint = subclass_properties.get('Constraint', None)
+            assert constraint is not None, f"☠️ No constraint found for '{subclass_phantom}'"
             attribute_names = self.parse_predicate(constraint)
             for attribute_name in attribute_names:
                 found = False
                 for superclass_name in superclass_names:
-                    found = found or self.H.get_cell_properties(superclass_name, attribute_name, "Kind") is not None
+                    found = found or incidence_properties.get((superclass_name, attribute_name), {}).get("Kind") is not None
                 if not found:
                     consistent = False
-                    print(f"🚨 IC-Atoms16 violation: The attribute '{attribute_name}' used in the generalization constraint of '{subclass.Index[1]}', not found in any of its superclasses '{superclass_names}'")
+                    print(f"🚨 IC-Atoms16 violation: The attribute '{attribute_name}' used in the generalization constraint of '{subclass_phantom}', not found in any of its superclasses '{superclass_names}'")
 
         # IC-Atoms17: Every association end has name and multiplicities
         logger.info("Checking IC-Atoms17")
@@ -637,59 +684,63 @@ class Catalog(HyperNetXWrapper):
             if not violations4_1.empty:
                 consistent = False
                 print("🚨 IC-Sets1 violation: There are sets without phantom")
-                display(violations4_1)
+                custom_display(violations4_1)
+
+            # Outbounds of sets are taken only once for the rest of checks on sets
+            outbound_sets = self.get_outbound_sets()
 
             # IC-Sets2: Sets cannot be empty
             logger.info("Checking IC-Sets2")
-            matches5_2 = self.get_outbound_sets().reset_index(drop=False).set_index("edges", drop=False)["edges"]
+            matches5_2 = outbound_sets.reset_index(drop=False).set_index("edges", drop=False)["edges"]
             violations5_2 = df_difference(sets["name"], matches5_2)
             if not violations5_2.empty:
                 consistent = False
                 print("🚨 IC-Sets2 violation: There are sets that are empty")
-                display(violations5_2)
+                custom_display(violations5_2)
 
             # IC-Sets3: Sets cannot directly contain attributes
             logger.info("Checking IC-Sets3")
-            violations4_3 = pd.merge(self.get_outbound_sets(), self.get_attributes(), on='nodes', suffixes=('_setOutbounds', '_attributes'),
+            violations4_3 = pd.merge(outbound_sets, self.get_attributes(), on='nodes', suffixes=('_setOutbounds', '_attributes'),
                                      how='inner')
             if not violations4_3.empty:
                 consistent = False
                 print("🚨 IC-Sets3 violation: There are sets that contain attributes")
-                display(violations4_3)
+                custom_display(violations4_3)
 
             # IC-Sets4: Sets cannot directly contain other sets
             logger.info("Checking IC-Sets4")
-            violations4_4 = pd.merge(self.get_outbound_sets(), self.get_inbound_sets(), on='nodes', suffixes=('_setOutbounds', '_setInbounds'), how='inner')
+            violations4_4 = pd.merge(outbound_sets, self.get_inbound_sets(), on='nodes', suffixes=('_setOutbounds', '_setInbounds'), how='inner')
             if not violations4_4.empty:
                 consistent = False
                 print("🚨 IC-Sets4 violation: There are sets that contain other sets")
-                display(violations4_4)
+                custom_display(violations4_4)
 
             # IC-Sets5: Sets cannot directly contain associations
             logger.info("Checking IC-Sets5")
-            violations4_5 = pd.merge(self.get_outbound_sets(), self.get_inbound_associations(), on='nodes', suffixes=('_setOutbounds', '_assocInbounds'), how='inner')
+            violations4_5 = pd.merge(outbound_sets, self.get_inbound_associations(), on='nodes', suffixes=('_setOutbounds', '_assocInbounds'), how='inner')
             if not violations4_5.empty:
                 consistent = False
                 print("🚨 IC-Sets5 violation: There are sets that contain associations")
-                display(violations4_5)
+                custom_display(violations4_5)
 
             # IC-Sets6: Sets cannot directly contain generalizations
             logger.info("Checking IC-Sets6")
-            violations4_6 = pd.merge(self.get_outbound_sets(), self.get_inbound_generalizations(), on='nodes', suffixes=('_setOutbounds', '_generInbounds'), how='inner')
+            violations4_6 = pd.merge(outbound_sets, self.get_inbound_generalizations(), on='nodes', suffixes=('_setOutbounds', '_generInbounds'), how='inner')
             if not violations4_6.empty:
                 consistent = False
                 print("🚨 IC-Sets6 violation: There are sets that contain generalizations")
-                display(violations4_6)
+                custom_display(violations4_6)
 
             # IC-Sets7: A set that contains a class, cannot contain anything else
             logger.info("Checking IC-Sets7")
-            sets_with_attributes = self.get_outbound_sets().reset_index(drop=False).merge(self.get_inbound_classes(), left_on='nodes', right_on='nodes', suffixes=('_sets', '_attributes'), how='inner')
-            matches4_7 = self.get_outbound_sets()[self.get_outbound_sets().index.get_level_values('edges').isin(sets_with_attributes['edges'])].groupby('edges').size()
+            set_edge_names = outbound_sets.index.get_level_values('edges')
+            sets_with_classes = set_edge_names[outbound_sets.index.get_level_values('nodes').isin(self.get_inbound_classes().index.get_level_values('nodes'))]
+            matches4_7 = outbound_sets[set_edge_names.isin(sets_with_classes)].groupby('edges').size()
             violations4_7 = matches4_7[matches4_7 > 1]
             if not violations4_7.empty:
                 consistent = False
                 print("🚨 IC-Sets5 violation: There are sets that contain a class, besides other elements")
-                display(violations4_7)
+                custom_display(violations4_7)
 
             # ------------------------------------------------------------------------------------------- ICs on structs
             custom_progress("    Checking constraints on structs")
@@ -701,7 +752,7 @@ class Catalog(HyperNetXWrapper):
             if not violations3_1.empty:
                 consistent = False
                 print("🚨 IC-Structs1 violation: There are structs without phantom")
-                display(violations3_1)
+                custom_display(violations3_1)
 
             # IC-Structs2: Every struct must be inside another struct or set
             logger.info("Checking IC-Structs2")
@@ -710,32 +761,35 @@ class Catalog(HyperNetXWrapper):
             if not violations3_2.empty:
                 consistent = False
                 print("🚨 IC-Structs2 violation: There are structs that do not belong to any other struct or set")
-                display(violations3_2)
+                custom_display(violations3_2)
 
             # IC-Structs3: Every struct has at least one anchor
             logger.info("Checking IC-Structs3")
-            matches3_3 = outbounds[outbounds["misc_properties"].apply(lambda x: x['Kind'] == 'StructIncidence' and x.get('Anchor', False))].groupby('edges').size()
+            # Anchor incidences are selected once for this check and the next one
+            anchor_outbounds = outbounds.loc[[properties['Kind'] == 'StructIncidence' and properties.get('Anchor', False) for properties in outbounds["misc_properties"]]]
+            matches3_3 = anchor_outbounds.groupby('edges').size()
             violations3_3 = structs[~structs["name"].isin((matches3_3[matches3_3 > 0].reset_index(drop=False))["edges"])]
             if not violations3_3.empty:
                 consistent = False
                 print("🚨 IC-Structs3 violation: There are structs without exactly one anchor")
-                display(violations3_3)
+                custom_display(violations3_3)
 
             # IC-Structs4: Anchors can be either classes or associations
             logger.info("Checking IC-Structs3")
-            matches3_4 = outbounds[outbounds["misc_properties"].apply(lambda x: x['Kind'] == 'StructIncidence' and x.get('Anchor', False))].reset_index(drop=False)['nodes']
-            violations3_4 = df_difference(matches3_4, pd.concat([self.get_phantom_classes(), self.get_phantom_associations()])["name"])
+            matches3_4 = anchor_outbounds.reset_index(drop=False)['nodes']
+            anchorable_names = {phantom_name for phantom_name, subkind in self.get_phantom_subkind_index().items() if subkind in ("Class", "Association")}
+            violations3_4 = df_difference(matches3_4, anchorable_names)
             if not violations3_4.empty:
                 consistent = False
                 print("🚨 IC-Structs4 violation: There are structs with an anchor which is neither class nor association")
-                display(violations3_4)
+                custom_display(violations3_4)
 
             # IC-Structs5: Anchors are connected
             logger.info("Checking IC-Structs5")
             for struct in self.get_structs().index:
                 edge_names = []
                 struct_outbounds = self.get_outbound_struct_by_name(struct)
-                for elem in struct_outbounds[struct_outbounds["misc_properties"].apply(lambda x: x['Kind'] == 'StructIncidence' and x.get('Anchor', False))].reset_index(level='edges', drop=True).index:
+                for elem in struct_outbounds.loc[[properties['Kind'] == 'StructIncidence' and properties.get('Anchor', False) for properties in struct_outbounds["misc_properties"]]].reset_index(level='edges', drop=True).index:
                     if self.is_class_phantom(elem) or self.is_association_phantom(elem):
                         edge_names.append(self.get_edge_by_phantom_name(elem))
                 restricted_struct = self.H.restrict_to_edges(edge_names)
@@ -770,28 +824,27 @@ class Catalog(HyperNetXWrapper):
             for struct_name in self.get_structs().index:
                 discriminants = []
                 restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
-                restricted_classes = restricted_struct.get_classes()
+                restricted_class_names = restricted_struct.get_classes().index.get_level_values("edges")
+                # Superclasses of every class in the struct are computed only once (instead of once per pair of classes)
+                superclasses = {class_name: frozenset(restricted_struct.get_superclasses_by_class_name(class_name)) for class_name in restricted_class_names}
+                subclass_links = restricted_struct.get_outbound_generalization_subclasses().reset_index(level="edges", drop=True)
                 # Foll all classes in the current struct
-                for class_name1 in restricted_classes.index.get_level_values("edges"):
-                    superclasses1 = restricted_struct.get_superclasses_by_class_name(class_name1)
+                for class_name1 in restricted_class_names:
+                    superclasses1 = superclasses[class_name1]
                     # If it has superclasses
                     if superclasses1:
                         # Check all other classes in the struct
-                        for class_name2 in restricted_classes.index.get_level_values("edges"):
-                            # Get their superclasses
-                            superclasses2 = restricted_struct.get_superclasses_by_class_name(class_name2)
+                        for class_name2 in restricted_class_names:
+                            superclasses2 = superclasses[class_name2]
                             # Check this is not actually itself or an ancestor
                             if class_name1 != class_name2 and class_name2 not in superclasses1 and class_name1 not in superclasses2:
                                 # Check if they are siblings
-                                if [s for s in superclasses1 if s in superclasses2]:
+                                if superclasses1 & superclasses2:
                                     # Check if the corresponding discriminant attribute is present(this works because we have single inheritance)
-                                    discriminants.append(
-                                        restricted_struct.get_outbound_generalization_subclasses().reset_index(
-                                            level="edges", drop=True).loc[
-                                            self.get_phantom_of_edge_by_name(class_name1)].misc_properties["Constraint"])
+                                    discriminants.append(subclass_links.loc[self.get_phantom_of_edge_by_name(class_name1)].misc_properties["Constraint"])
                 attribute_names = drop_duplicates(self.parse_predicate(" AND ".join(discriminants)))
                 for attr in attribute_names:
-                    kind = self.H.get_cell_properties(struct_name, attr, "Kind")
+                    kind = self.get_incidence_properties_index().get((struct_name, attr), {}).get("Kind")
                     if kind is None:
                         consistent = False
                         print(f"🚨 IC-Structs8 violation: The struct '{struct_name}' should have attribute '{attr}' to be used as a discriminant in a generalization")
@@ -807,11 +860,14 @@ class Catalog(HyperNetXWrapper):
                     print(f"🚨 IC-Structs-b violation: The struct '{struct_name}' is not connected")
                     restricted_struct.show_textual()
                 anchor_points = self.get_anchor_points_by_struct_name(struct_name)
-                bipartite = restricted_struct.H.remove_edges(self.get_anchor_associations_by_struct_name(struct_name)).bipartite()
+                bipartite = self.get_struct_bipartite_by_struct_name(struct_name)
                 for attr in attribute_names:
                     paths = []
                     for anchor in anchor_points:
-                        paths += list(nx.all_simple_paths(bipartite, source=anchor, target=attr))
+                        paths += find_simple_paths(bipartite, source=anchor, target=attr)
+                        # Finding a second path is already enough to know that it is ambiguous
+                        if len(paths) > 1:
+                            break
                     if len(paths) > 1:
                         consistent = False
                         print(f"🚨 IC-Structs-b violation: The struct '{struct_name}' has multiple paths '{paths}', which generates ambiguity in the meaning of some attribute")
@@ -820,17 +876,19 @@ class Catalog(HyperNetXWrapper):
             #               Also need to check that max multiplicity is one (otherwise, it should be a set)
             logger.info("Checking IC-Structs-c")
             for external_struct_name in self.get_structs().index:
+                # The graph only depends on the parent struct, so it is built once (and only if it contains other structs)
+                bipartite = None
                 for elem_name in self.get_outbound_struct_by_name(external_struct_name).index.get_level_values("nodes"):
                     if self.is_phantom(elem_name):
                         edge_name = self.get_edge_by_phantom_name(elem_name)
                         if self.is_struct(edge_name):
                             internal_struct_name = edge_name
-                            restricted_struct = self.get_restricted_struct_hypergraph(external_struct_name)
-                            bipartite = restricted_struct.H.bipartite()
+                            if bipartite is None:
+                                bipartite = self.get_restricted_struct_hypergraph(external_struct_name).H.bipartite()
                             for internal_anchor in self.get_anchor_points_by_struct_name(internal_struct_name):
                                 found = False
                                 for external_anchor in self.get_anchor_points_by_struct_name(external_struct_name):
-                                    paths = list(nx.all_simple_paths(bipartite, source=external_anchor, target=internal_anchor))
+                                    paths = find_simple_paths(bipartite, source=external_anchor, target=internal_anchor)
                                     if len(paths) > 0:
                                         found = True
                                         if len(paths) > 1:
@@ -844,12 +902,12 @@ class Catalog(HyperNetXWrapper):
             # IC-Structs-d: All sets inside a struct must contain a unique path of associations connecting the parent struct to either the class or anchor of the struct inside the set (Definition 7-d)
             #               Actually, this just check that the parent struct has an association to either the class or every element in the anchor
             logger.info("Checking IC-Structs-d")
-            sets_within_struct = self.get_outbound_structs().reset_index(drop=False).merge(self.get_inbound_sets(), left_on='nodes', right_on='nodes', suffixes=('_struct', '_set'), how='inner')
-            for set_struct in sets_within_struct.itertuples():
-                external_struct_name = set_struct.edges
+            outbound_structs = self.get_outbound_structs()
+            sets_within_struct = outbound_structs.index[outbound_structs.index.get_level_values('nodes').isin(self.get_inbound_sets().index.get_level_values('nodes'))]
+            for external_struct_name, set_phantom in sets_within_struct:
                 # The content of a set can be either one single class, or several structs
                 # In the case of several structs, all must share the same anchor, so anyway, taking the fist element is enough
-                internal_elem_name = self.get_outbound_set_by_name(self.get_edge_by_phantom_name(set_struct.nodes)).index[0][1]
+                internal_elem_name = self.get_outbound_set_by_name(self.get_edge_by_phantom_name(set_phantom)).index[0][1]
                 restricted_struct = self.get_restricted_struct_hypergraph(external_struct_name)
                 if self.is_class_phantom(internal_elem_name):
                     # By IC-Sets7 a set can have at most one class
@@ -858,13 +916,13 @@ class Catalog(HyperNetXWrapper):
                     superclass_phantoms.append(internal_elem_name)
                     if all([p not in restricted_struct.get_association_ends()["nodes"].values for p in superclass_phantoms]):
                         consistent = False
-                        print(f"🚨 IC-Structs-d violation: Class '{internal_elem_name}' included in set '{set_struct.nodes}' is not connected to struct '{external_struct_name}', which contains said set")
+                        print(f"🚨 IC-Structs-d violation: Class '{internal_elem_name}' included in set '{set_phantom}' is not connected to struct '{external_struct_name}', which contains said set")
                 else:
-                    assert self.is_struct_phantom(internal_elem_name), f"☠️ The element '{internal_elem_name}' inside set '{set_struct.nodes}', which is not a class, should be a struct, but it is not"
+                    assert self.is_struct_phantom(internal_elem_name), f"☠️ The element '{internal_elem_name}' inside set '{set_phantom}', which is not a class, should be a struct, but it is not"
                     for anchor_point in self.get_anchor_points_by_struct_name(internal_elem_name):
                         if self.get_phantom_of_edge_by_name(anchor_point) not in restricted_struct.get_nodes().index:
                             consistent = False
-                            print(f"🚨 IC-Structs-d violation: Anchor point '{anchor_point}' of struct '{internal_elem_name}' and included in set '{set_struct.nodes}' is not connected to struct '{external_struct_name}', which contains said set")
+                            print(f"🚨 IC-Structs-d violation: Anchor point '{anchor_point}' of struct '{internal_elem_name}' and included in set '{set_phantom}' is not connected to struct '{external_struct_name}', which contains said set")
 
             # IC-Structs-e: All associations inside a struct connect either a class or another struct (Definition 7-e)
             #               This needs to be relaxed to simply structs being connected
@@ -879,28 +937,30 @@ class Catalog(HyperNetXWrapper):
 
             # ----------------------------------------------------------------------------------------- ICs about design
             custom_progress("    Checking generic design constraints")
+            # The first level is taken only once, because several design checks start from it
+            firstlevel = self.get_inbound_firstLevel()
 
             # IC-Design1: All the first levels must be sets
             logger.info("Checking IC-Design1")
-            matches5_1 = self.get_inbound_firstLevel()
+            matches5_1 = firstlevel
             violations5_1 = matches5_1[~matches5_1["misc_properties"].apply(lambda x: x['Kind'] == 'SetIncidence')]
             if not violations5_1.empty:
                 consistent = False
                 print("🚨 IC-Design1 violation: All first levels must be sets")
-                display(violations5_1)
+                custom_display(violations5_1)
 
             # IC-Design2: All the attributes and associations in the domain are connected to the first level
             #             Classes are excluded from the check because of generalization
             logger.info("Checking IC-Design2")
             matches5_2 = []
-            for set_name in self.get_inbound_firstLevel().index.get_level_values("edges"):
+            for set_name in firstlevel.index.get_level_values("edges"):
                 matches5_2.extend(self.get_atoms_including_transitivity_by_edge_name(set_name))
             atoms5_2 = pd.concat([self.get_attributes(), self.get_phantom_associations()])
             violations5_2 = atoms5_2[~atoms5_2.index.isin(matches5_2)]
             if not violations5_2.empty:
                 consistent = False
                 print("🚨 IC-Design2 violation: Atoms disconnected from the first level")
-                display(violations5_2)
+                custom_display(violations5_2)
 
             # IC-Design3: All domain elements must appear in some struct or set
             #             This is relaxed into just a warning, because of generalizations
@@ -911,7 +971,7 @@ class Catalog(HyperNetXWrapper):
                 # consistent = False
                 warnings.warn("⚠️ IC-Design3 violation: Some atoms do not belong to any struct or set")
                 if config.show_warnings:
-                    display(violations5_3)
+                    custom_display(violations5_3)
 
             # IC-Design4: All structs in a set must have the same attributes in the anchor
             # IC-Design5: For all structs in a set, there must be a difference in a class in the anchor, which are related by generalization
@@ -921,11 +981,13 @@ class Catalog(HyperNetXWrapper):
             logger.info("Checking IC-Design4")
             logger.info("Checking IC-Design5")
             logger.info("Checking IC-Design6")
+            struct_phantom_names = set(self.get_phantom_structs().index)
             for set_name in sets.index:
                 anchor_concepts = []
                 anchor_attributes = []
                 set_attributes = []
-                struct_phantom_list = pd.merge(self.get_outbound_set_by_name(set_name), self.get_phantom_structs(), on="nodes", how="inner").index
+                set_nodes = self.get_outbound_set_by_name(set_name).index.get_level_values("nodes")
+                struct_phantom_list = [node_name for node_name in set_nodes if node_name in struct_phantom_names]
                 for struct_phantom in struct_phantom_list:
                     struct_name = self.get_edge_by_phantom_name(struct_phantom)
                     set_attributes.extend(self.get_attribute_names_by_struct_name(struct_name))
@@ -967,13 +1029,11 @@ class Catalog(HyperNetXWrapper):
                                             # Check if the class to be discriminated is not the top of the hierarchy
                                             if self.get_superclasses_by_class_name(class_name):
                                                 # Now we need to check if the corresponding discriminant is in the table (actually, we should check in the same struct)
-                                                discriminant = self.get_outbound_generalization_subclasses().reset_index(level="edges", drop=True).loc[phantom_name].misc_properties.get("Constraint", None)
+                                                discriminant = self.get_discriminant_by_class_name(class_name)
                                                 assert discriminant is not None, f"☠️ No discriminant for '{class_name}'"
                                                 attribute_names = self.parse_predicate(discriminant)
-                                                found = True
-                                                for attribute_name in attribute_names:
-                                                    # This is just checking if the attribute is in the table, but actually it should check if it is in the current struct
-                                                    found = found and attribute_name in set_attributes
+                                                # This is just checking if the attribute is in the table, but actually it should check if it is in the current struct
+                                                found = all(attribute_name in set_attributes for attribute_name in attribute_names)
                                                 if not found:
                                                     consistent = False
                                                     print(f"🚨 IC-Design6 violation: Some discriminant attribute missing in set '{set_name}' required for '{class_name}'")
@@ -983,9 +1043,11 @@ class Catalog(HyperNetXWrapper):
             # IC-Design7: Any struct with a class with subclasses must contain the corresponding discriminants
             #             It is implemented as a warning, because it could be acceptable as soon as the class is not used in the queries
             logger.info("Checking IC-Design7 (produces just warnings)")
+            inbound_classes = self.get_inbound_classes()
             for struct_name in self.get_structs().index:
                 # Get all class names in the current struct
-                class_names = self.get_inbound_classes()[self.get_inbound_classes().index.get_level_values("nodes").isin(pd.merge(self.get_outbound_struct_by_name(struct_name), self.get_inbound_classes(), on="nodes", how="inner").index)].index.get_level_values("edges")
+                struct_nodes = self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes")
+                class_names = inbound_classes[inbound_classes.index.get_level_values("nodes").isin(struct_nodes)].index.get_level_values("edges")
                 attribute_names = self.get_attribute_names_by_struct_name(struct_name)
                 for class_name in class_names:
                     for subclass_name in self.get_subclasses_by_class_name(class_name):
@@ -999,33 +1061,41 @@ class Catalog(HyperNetXWrapper):
             #             Such anchor must have min multiplicity one internally, to guarantee that it does not miss any instance.
             #             This is relaxed to be just a warning, as above, just because of generalizations.
             logger.info("Checking IC-Design8 (produces just warnings)")
+            # Graphs of the anchors are shared by all the classes in the same struct
+            anchor_bipartites = {}
+            struct_names = self.get_structs().index
+            # Elements of every struct are gathered in a set once, instead of scanning them for every class
+            outbound_nodes = self.get_outbound_node_names_by_edge_name()
+            struct_elements = {struct_name: set(outbound_nodes.get(struct_name, [])) for struct_name in struct_names}
             for class_name in self.get_classes().index:
                 class_phantom = self.get_phantom_of_edge_by_name(class_name)
                 found = False
-                for struct_name in self.get_structs().index:
+                for struct_name in struct_names:
                     # Check if the class is in this struct
-                    if class_phantom in self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes"):
-                        dont_cross = self.get_anchor_associations_by_struct_name(struct_name)
-                        restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
-                        bipartite = restricted_struct.H.remove_edges(dont_cross).bipartite()
+                    if class_phantom in struct_elements[struct_name]:
+                        bipartite = self.get_struct_bipartite_by_struct_name(struct_name)
                         anchor_points = self.get_anchor_points_by_struct_name(struct_name)
                         for anchor_point in anchor_points:
                             if self.is_class_phantom(anchor_point):
-                                paths = list(nx.all_simple_paths(bipartite, source=class_phantom, target=anchor_point))
                                 # There can be more than one path from a class to the first level, as soon as it goes through different structs, but this is not relevant here
-                                for path in paths:
+                                # Paths are generated lazily, since we stop looking for them as soon as one is found with min multiplicity one
+                                for path in nx.all_simple_paths(bipartite, source=class_phantom, target=anchor_point):
                                     # First position in the tuple is the min multiplicity
                                     found = self.check_multiplicities_to_one(path)[0]
                                     if found:
                                         # Check that the internal multiplicity of the anchor point in the anchor is also min to one with all other anchor points
                                         # This means all dont_cross have min multiplicity one
-                                        restricted_anchor_struct = self.get_restricted_struct_hypergraph(struct_name, only_anchor=True)
-                                        bipartite_anchor = restricted_anchor_struct.H.bipartite()
+                                        if struct_name not in anchor_bipartites:
+                                            anchor_bipartites[struct_name] = self.get_restricted_struct_hypergraph(struct_name, only_anchor=True).H.bipartite()
+                                        bipartite_anchor = anchor_bipartites[struct_name]
                                         for anchor_point2 in anchor_points:
-                                            anchor_paths = list(nx.all_simple_paths(bipartite_anchor, source=anchor_point, target=anchor_point2))
+                                            anchor_paths = find_simple_paths(bipartite_anchor, source=anchor_point, target=anchor_point2)
                                             assert len(anchor_paths) > 0, f"☠️ No path found in the anchor of struct '{struct_name}' between points '{anchor_point}' and '{anchor_point2}'"
                                             assert len(anchor_paths) < 2, f"☠️ Multiple paths '{anchor_paths}' found in the anchor of struct '{struct_name}' between points '{anchor_point}' and '{anchor_point2}'"
-                                            found = found and self.check_multiplicities_to_one(anchor_paths[0])[0]
+                                            # First position in the tuple is the min multiplicity (one failure is enough)
+                                            if not self.check_multiplicities_to_one(anchor_paths[0])[0]:
+                                                found = False
+                                                break
                                         # If the problem is in the anchor, we do not need to continue checking paths anyway (any other path to the same anchor point will have the same problem)
                                         break
                                 if found: break
@@ -1060,9 +1130,10 @@ class Catalog(HyperNetXWrapper):
         :param required_attributes:
         """
         # Check if the hypergraph contains all the pattern hyperedges
-        non_existing_associations = df_difference(pd.DataFrame(pattern_edges), pd.concat([self.get_classes(), self.get_associations()])["name"].reset_index(drop=True))
-        if not non_existing_associations.empty:
-            raise ValueError(f"🚨 Some class or association in the pattern does not belong to the catalog: {non_existing_associations.values.tolist()[0]}")
+        edge_kinds = self.get_edge_kind_index()
+        non_existing_associations = [edge for edge in pattern_edges if edge_kinds.get(edge) not in ("Class", "Association")]
+        if non_existing_associations:
+            raise ValueError(f"🚨 Some class or association in the pattern does not belong to the catalog: {non_existing_associations[0]}")
 
         superclasses = []
         for e in pattern_edges:
@@ -1075,47 +1146,37 @@ class Catalog(HyperNetXWrapper):
             raise ValueError(f"🚨 Some pattern elements (i.e., classes and associations) are not connected")
 
         # Check if the restricted domain contains all the required attributes and association ends
-        attributes = pd.merge(restricted_domain.nodes.dataframe, self.get_attributes(), left_index=True, right_index=True, how="inner")["name"]
-        hop1 = pd.merge(restricted_domain.nodes.dataframe, self.get_inbound_associations().reset_index(drop=False), left_index=True, right_on="nodes", suffixes=('_associationPhantoms', '_inbounds'), how="inner")
-        hop2 = pd.merge(hop1, self.get_outbound_associations().reset_index(drop=False), left_on="edges", right_on="edges", suffixes=('_inbounds', '_outbounds'), how="inner")
-        association_ends = hop2.apply(lambda row: row["misc_properties"]["End_name"], axis=1)
-        association_ends.name = "name"
-        if attributes.empty:
-            missing_attributes = df_difference(pd.DataFrame(required_attributes), association_ends)
-        elif association_ends.empty:
-            missing_attributes = df_difference(pd.DataFrame(required_attributes), attributes)
-        else:
-            missing_attributes = df_difference(pd.DataFrame(required_attributes), pd.concat([attributes, association_ends], axis=0))
-        if not missing_attributes.empty:
-            raise ValueError(f"🚨 Some attributes {missing_attributes.values.tolist()} in the request are not covered by the elements in the pattern {pattern_edges}")
+        # Nodes are classified with the memoized indexes, instead of merging them with attributes and associations
+        restricted_node_names = restricted_domain.nodes.dataframe.index
+        covered_names = {node_name for node_name in restricted_node_names if self.is_attribute(node_name)}
+        restricted_associations = {self.get_edge_by_phantom_name(node_name) for node_name in restricted_node_names if self.is_association_phantom(node_name)}
+        association_ends = self.get_association_ends()
+        if not association_ends.empty:
+            covered_names.update([end_name for end_name, association_name in zip(association_ends.index, association_ends["edges"]) if association_name in restricted_associations])
+        missing_attributes = [attr for attr in required_attributes if attr not in covered_names]
+        if missing_attributes:
+            raise ValueError(f"🚨 Some attributes {missing_attributes} in the request are not covered by the elements in the pattern {pattern_edges}")
 
     def check_query_structure(self, project_attributes, filter_attributes, pattern_edges, required_attributes) -> None:
+        # Attributes (IDs included) and association ends are looked up in the memoized indexes of the catalog
         # Check if the hypergraph contains all the projected attributes
-        non_existing_attributes = df_difference(pd.DataFrame(project_attributes), pd.concat([self.get_ids(), self.get_attributes(), self.get_association_ends()])["name"].reset_index(drop=True))
-        if not non_existing_attributes.empty:
-            raise ValueError(f"🚨 Some attribute in the projection does not belong to the catalog: {non_existing_attributes.values.tolist()[0]}")
+        non_existing_attributes = [attr for attr in project_attributes if not self.is_attribute(attr) and not self.is_association_end(attr)]
+        if non_existing_attributes:
+            raise ValueError(f"🚨 Some attribute in the projection does not belong to the catalog: {non_existing_attributes[0]}")
 
         # Check if the hypergraph contains all the filter attributes
-        non_existing_attributes = df_difference(pd.DataFrame(filter_attributes), pd.concat([self.get_ids(), self.get_attributes(), self.get_association_ends()])["name"].reset_index(drop=True))
-        if not non_existing_attributes.empty:
-            raise ValueError(f"🚨 Some attribute in the filter does not belong to the catalog: {non_existing_attributes.values.tolist()[0]}")
+        non_existing_attributes = [attr for attr in filter_attributes if not self.is_attribute(attr) and not self.is_association_end(attr)]
+        if non_existing_attributes:
+            raise ValueError(f"🚨 Some attribute in the filter does not belong to the catalog: {non_existing_attributes[0]}")
 
         self.check_basic_request_structure(pattern_edges, required_attributes)
 
     def parse_predicate(self, predicate) -> list[str]:
         attributes = []
-        where_clause = "WHERE "+predicate
-        where_parsed = sqlparse.parse(where_clause)[0].tokens[0]
-
-        # This extracts the attribute names
-        # TODO: Parenthesis are not considered by now. It will require some kind of recursion
-        for atom in where_parsed.tokens:
-            if atom.ttype is None:  # This is a clause in the predicate
-                for token in atom.tokens:
-                    if token.ttype is None:  # This is an attribute in the predicate
-                        if not self.is_attribute(token.value):
-                            raise ValueError(f"🚨 '{token.value}' (in a filter or constraint) is not an attribute")
-                        attributes.append(token.value)
+        for name in extract_predicate_names(predicate):
+            if not self.is_attribute(name):
+                raise ValueError(f"🚨 '{name}' (in a filter or constraint) is not an attribute")
+            attributes.append(name)
         return attributes
 
     def parse_query(self, query) -> tuple[list[str], list[str], list[str], list[str], str]:
@@ -1154,7 +1215,7 @@ class Catalog(HyperNetXWrapper):
             filter_clause = "TRUE"
         filter_attributes = drop_duplicates(self.parse_predicate(filter_clause))
         # Identifiers of all classes are added to guarantee that a table containing the class is used in the query
-        required_attributes = list(set(project_attributes + filter_attributes + identifiers))
+        required_attributes = drop_duplicates(project_attributes + filter_attributes + identifiers)
 
         self.check_query_structure(project_attributes, filter_attributes, pattern_edges, required_attributes)
         return project_attributes, filter_attributes, pattern_edges, required_attributes, filter_clause
@@ -1187,12 +1248,15 @@ class Catalog(HyperNetXWrapper):
         buckets = []
         classes = []
         associations = []
+        # The first levels containing every edge or atom are resolved once for all elements in the pattern
+        firstlevels_by_edge = self.get_firstlevels_by_edge_name()
+        firstlevels_by_atom = self.get_firstlevels_by_atom_name()
+        outbound_nodes = self.get_outbound_node_names_by_edge_name()
         for elem in pattern:
             # Find the sets at fist level where the element belongs
             hierarchy = [elem]+self.get_superclasses_by_class_name(elem)
-            first_levels = drop_duplicates(self.get_transitive_firstLevels(hierarchy))
             # Sorting the list of tables is important to drop duplicates later
-            first_levels.sort()
+            first_levels = sorted(set(first_level for edge_name in hierarchy for first_level in firstlevels_by_edge.get(edge_name, [])))
             # Split join edges into classes and associations
             if self.is_association(elem):
                 associations.append(elem)
@@ -1203,29 +1267,51 @@ class Catalog(HyperNetXWrapper):
                 current_attributes = []
                 # Take the required attributes in the class that are in the current table
                 for class_name in hierarchy:
-                    current_attributes.extend(self.get_outbound_class_by_name(class_name)[self.get_outbound_class_by_name(class_name).index.get_level_values('nodes').isin(required_attributes)].index.get_level_values('nodes').to_list())
+                    current_attributes.extend([attr for attr in outbound_nodes.get(class_name, []) if attr in required_attributes])
                 # If it is a class, the id always belongs to the table, hence we add it even if not required
-                if self.get_class_id_by_name(elem) not in current_attributes:
-                    current_attributes.append(self.get_class_id_by_name(elem))
+                class_id = self.get_class_id_by_name(elem)
+                if class_id not in current_attributes:
+                    current_attributes.append(class_id)
                 # If it is a class, it may be vertically partitioned
                 # We need to generate joins of these tables that cover all required attributes one by one
-                # Get the tables independently for every attribute in the class
-                #    First, we precompute the attributes of all sets (which is expensive) to save time
-                attrs_of_set = {}
-                for set_name in first_levels:
-                    attrs_of_set[set_name] = self.get_atoms_including_transitivity_by_edge_name(set_name)
+                # Get the tables independently for every attribute in the class (among those containing the class)
                 for attr in current_attributes:
                     if not self.is_id(attr) or len(current_attributes) == 1:
-                        firstlevels_with_attr = []
-                        for set_name in first_levels:
-                            if attr in attrs_of_set[set_name]:
-                                firstlevels_with_attr.append(set_name)
+                        firstlevels_with_attr = [set_name for set_name in firstlevels_by_atom.get(attr, []) if set_name in first_levels]
                         if firstlevels_with_attr:
                             buckets.append(firstlevels_with_attr)
         # Generate combinations of the buckets of each element to get the minimal combinations of tables that cover all of them
         # TODO: Actually, it is not guaranteed that all of them are covered. It should be checked
         return combine_buckets(drop_duplicates(buckets)), classes, associations
 
+    @memoized
+    def get_attribute_projections_by_set_name(self, set_name) -> dict[str, str]:
+        """
+        This method generates the projections of the domain attributes (and association ends) found in a table.
+        They do not depend on the other tables in the query, so they are generated only once for all queries and combinations of tables.
+        The same dictionary is shared by all callers, so it must not be modified.
+        :param set_name: The table whose attributes are projected.
+        :return: Dictionary of projections of domain attributes in the table.
+        """
+        set_proj_attr = {}
+        for struct_name in self.get_struct_names_inside_set_name(set_name):
+            custom_progress("--------Processing %s", struct_name)
+            # This bar is created for every struct of every table, so it is not even drawn if progress is not shown
+            for dom_attr_name, attr_path in tqdm(self.get_struct_attributes(struct_name), desc=f"----------Attributes in {struct_name}", leave=config.show_progress, disable=not config.show_progress):
+                attr_proj = self.generate_attr_projection_clause(attr_path)
+                # In case of generalization, the attribute may be overwritten, but they should coincide
+                # It is fine that two classes appear in a struct, as soon as they are queried based on the corresponding association end
+                assert dom_attr_name not in set_proj_attr or attr_proj == set_proj_attr[dom_attr_name], f"☠️ Attribute '{dom_attr_name}' ambiguous in struct '{struct_name}': '{set_proj_attr[dom_attr_name]}' and '{attr_proj}' (it should not be used in the query)"
+                set_proj_attr[dom_attr_name] = attr_proj
+            custom_progress("----------Processing its association ends")
+            # From here on in the loop is necessary to translate queries based on association ends, when the design actually stores the class ID
+            # Set the location of all association ends that have a class in the struct (i.e., non-loose ends)
+            for end_name, end_phantom in self.get_bound_association_ends_by_struct_name(struct_name):
+                dom_attr_name = self.get_class_id_by_name(self.get_edge_by_phantom_name(end_phantom))
+                assert dom_attr_name in set_proj_attr, f"☠️ Attribute '{dom_attr_name}' does not exist in '{struct_name}'"
+                set_proj_attr[end_name] = set_proj_attr[dom_attr_name]
+        return set_proj_attr
+
     def get_aliases(self, sets_combination) -> tuple[dict[str, str], dict[str, str], dict[str, str], dict[str, str]]:
         """
         This method generates correspondences of aliases of tables and renamings of attributes in a query.
@@ -1235,40 +1321,18 @@ class Catalog(HyperNetXWrapper):
         :return: Dictionary of joins of domain attributes.
         :return: Dictionary of table locations of domain attributes.
         """
-        alias_set = {}
+        # Tables are numbered in order of appearance
+        alias_set = {set_name: self.config.prepend_table_alias + str(index + 1) for index, set_name in enumerate(sets_combination)}
         proj_attr = {}
         join_attr = {}
         location_attr = {}
-        # The list of tables is reversed, so that the first appearance of an attribute prevails (seems more logical)
-        for index, set_name in enumerate(reversed(sets_combination)):
-            # Determine the aliases of tables and required attributes
-            alias_set[set_name] = self.config.prepend_table_alias + str(len(sets_combination) - index)
-            for struct_name in self.get_struct_names_inside_set_name(set_name):
-                custom_progress(f"--------Processing {struct_name}")
-                for dom_attr_name, attr_path in tqdm(self.get_struct_attributes(struct_name), desc=f"----------Attributes in {struct_name}", leave=config.show_progress):
-                    # In case of generalization, the attribute may be overwritten, but they should coincide
-                    # It is fine that two classes appear in a struct, as soon as they are queried based on the corresponding association end
-                    assert dom_attr_name not in location_attr or location_attr[dom_attr_name] != alias_set[set_name] or self.generate_attr_projection_clause(attr_path) == proj_attr[dom_attr_name], f"☠️ Attribute '{dom_attr_name}' ambiguous in struct '{struct_name}': '{proj_attr[dom_attr_name]}' and '{self.generate_attr_projection_clause(attr_path)}' (it should not be used in the query)"
-                    location_attr[dom_attr_name] = alias_set[set_name]
-                    proj_attr[dom_attr_name] = self.generate_attr_projection_clause(attr_path)
-                    join_attr[dom_attr_name + "@" + set_name] = self.generate_attr_projection_clause(attr_path)
-                custom_progress(f"----------Processing its association ends")
-                # From here on in the loop is necessary to translate queries based on association ends, when the design actually stores the class ID
-                atoms = self.get_atoms_including_transitivity_by_edge_name(struct_name)
-                associations = self.get_inbound_associations()[self.get_inbound_associations().index.get_level_values("nodes").isin(atoms)]
-                classes = self.get_inbound_classes()[self.get_inbound_classes().index.get_level_values("nodes").isin(atoms)]
-                association_ends = self.get_outbound_associations()[
-                    (self.get_outbound_associations().index.get_level_values("edges").isin(
-                        associations.index.get_level_values("edges"))) & (
-                        self.get_outbound_associations().index.get_level_values("nodes").isin(
-                            classes.index.get_level_values("nodes")))]
-                # Set the location of all association ends that have a class in the struct (i.e., non-loose ends)
-                for end in association_ends.itertuples():
-                    location_attr[end.misc_properties["End_name"]] = alias_set[set_name]
-                    dom_attr_name = self.get_class_id_by_name(self.get_edge_by_phantom_name(end.Index[1]))
-                    assert dom_attr_name in proj_attr and dom_attr_name + "@" + set_name in join_attr, f"☠️ Attribute '{dom_attr_name}' does not exist in '{struct_name}'"
-                    proj_attr[end.misc_properties["End_name"]] = proj_attr[dom_attr_name]
-                    join_attr[end.misc_properties["End_name"] + "@" + set_name] = join_attr[dom_attr_name + "@" + set_name]
+        for set_name in sets_combination:
+            # Projections of the attributes found in the current table (shared by all combinations containing it)
+            for dom_attr_name, attr_proj in self.get_attribute_projections_by_set_name(set_name).items():
+                join_attr[dom_attr_name + "@" + set_name] = attr_proj
+                # The first appearance of an attribute prevails (seems more logical)
+                location_attr.setdefault(dom_attr_name, alias_set[set_name])
+                proj_attr.setdefault(dom_attr_name, attr_proj)
         return alias_set, proj_attr, join_attr, location_attr
 
     def get_discriminants(self, sets_combination, pattern_class_names) -> list[str]:
@@ -1287,17 +1351,17 @@ class Catalog(HyperNetXWrapper):
                 # For every first level set required in the query
                 for set_name in sets_combination:
                     for struct_name in self.get_struct_names_inside_set_name(set_name):
-                        # Get all classes in the current struct of the current table
-                        table_classes = self.get_inbound_classes()[self.get_inbound_classes().index.get_level_values("nodes").isin(pd.merge(self.get_outbound_struct_by_name(struct_name), self.get_inbound_classes(), on="nodes", how="inner").index)]
+                        # Get all classes in the current struct of the current table (phantoms are resolved with the memoized index)
+                        struct_nodes = self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes")
+                        table_class_names = [self.get_edge_by_phantom_name(node_name) for node_name in struct_nodes if self.is_class_phantom(node_name)]
                         # For all classes in the table
-                        for table_class_name in table_classes.index.get_level_values("edges"):
+                        for table_class_name in table_class_names:
                             # Check if they are siblings
                             if table_class_name in pattern_superclasses:
                                 discriminant = self.get_discriminant_by_class_name(pattern_class_name)
                                 assert discriminant is not None, f"☠️ No discriminant for '{pattern_class_name}'"
-                                found = True
-                                for attribute_name in self.parse_predicate(discriminant):
-                                    found = found and attribute_name in self.get_attribute_names_by_struct_name(struct_name)
+                                struct_attribute_names = self.get_attribute_names_by_struct_name(struct_name)
+                                found = all(attribute_name in struct_attribute_names for attribute_name in self.parse_predicate(discriminant))
                                 if not found:
                                     raise ValueError(f"🚨 Some discriminant attribute missing in struct '{struct_name}' of table '{set_name}' for '{pattern_class_name}' in the query (IC-Design7 should have warned about this)")
                                 # Add the corresponding discriminant (this works because we have single inheritance)
@@ -1321,6 +1385,7 @@ class Catalog(HyperNetXWrapper):
         if len(insert_points) > 1:
             warnings.warn(f"⚠️ The insertion may be ambiguous or there is redundancy in the design, since it affects different tables: {insert_points}")
         result = []
+        association_ends = self.get_association_ends()
         for set_name in insert_points:
             struct_name_list = self.get_struct_names_inside_set_name(set_name)
             # Check that all anchor points are provided
@@ -1338,13 +1403,11 @@ class Catalog(HyperNetXWrapper):
             # Check if all mandatory information is provided
             replacements = {}
             for struct_name in struct_name_list:
-                # Create a restricted struct to search for paths that do not cross the anchor
-                dont_cross = self.get_anchor_associations_by_struct_name(struct_name)
-                restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
-                bipartite = restricted_struct.H.remove_edges(dont_cross).bipartite()
+                # Take the restricted struct to search for paths that do not cross the anchor
+                bipartite = self.get_struct_bipartite_by_struct_name(struct_name)
                 for table_attribute in self.get_attribute_names_by_struct_name(struct_name):
                     for anchor_attribute in anchor_attributes:
-                        paths = list(nx.all_simple_paths(bipartite, source=anchor_attribute, target=table_attribute))
+                        paths = find_simple_paths(bipartite, source=anchor_attribute, target=table_attribute)
                         assert len(
                             paths) <= 1, f"☠️ Unexpected problem in '{struct_name}' on finding more than one path '{paths}' between '{anchor_attribute}' and '{table_attribute}'"
                         # It may happen that the attribute is not connected to this anchor (still should be connected to another one)
@@ -1354,7 +1417,7 @@ class Catalog(HyperNetXWrapper):
                                 # If the attribute is an ID, -2 is its class, -3 is its phantom and -4 is the association
                                 if len(paths[0]) > 3 and self.is_id(table_attribute):
                                     # If it is an association end, we take note of the replacement
-                                    alternative = self.get_association_ends().query(f"edges=='{paths[0][-4]}' and nodes=='{paths[0][-3]}'").iloc[0]["name"]
+                                    alternative = association_ends[(association_ends["edges"] == paths[0][-4]) & (association_ends["nodes"] == paths[0][-3])].iloc[0]["name"]
                                     if alternative in provided_attributes:
                                         replacements[alternative] = table_attribute
                                 else:
@@ -1,17 +1,11 @@
 import logging
 import warnings
 import pandas as pd
-from IPython.display import display
-import networkx as nx
 from tqdm import tqdm
 
 from . import config
 from .relational import Relational
-from .tools import custom_warning, custom_progress, drop_duplicates
-
-# Library initialization
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', 1000)
+from .tools import custom_warning, custom_progress, custom_display, drop_duplicates, find_simple_paths, to_adjacency
 
 logger = logging.getLogger("FirstNormalForm")
 warnings.showwarning = custom_warning
@@ -31,35 +25,38 @@ class FirstNormalForm(Relational):
         # Not worth to check anything if the more basic stuff is already not consistent
         if consistent:
             firstlevel_names = self.get_inbound_firstLevel().index.get_level_values("edges")
+            # Frames used by several checks are taken only once
+            sets = self.get_sets()
+            outbound_sets = self.get_outbound_sets()
+            struct_phantom_names = self.get_phantom_structs().index
 
             # ---------------------------------------------------------------- ICs about being a First Normal Form catalog
             custom_progress("    Checking 1NF constraints")
 
             # IC-FirstNormalForm1: Sets can only appear at the first level
             logger.info("Checking IC-FirstNormalForm1")
-            violations7_1 = self.get_sets()[~self.get_sets().index.isin(firstlevel_names)]
+            violations7_1 = sets[~sets.index.isin(firstlevel_names)]
             if not violations7_1.empty:
                 consistent = False
                 print(f"🚨 IC-FirstNormalForm1 violation: Some sets are not at first level")
-                display(violations7_1)
+                custom_display(violations7_1)
 
             # IC-FirstNormalForm2: Sets can only contain structs
             logger.info("Checking IC-FirstNormalForm2")
-            struct_phantom_names = self.get_phantom_structs().index
-            violations7_2 = self.get_outbound_sets()[~self.get_outbound_sets().index.get_level_values("nodes").isin(struct_phantom_names)]
+            violations7_2 = outbound_sets[~outbound_sets.index.get_level_values("nodes").isin(struct_phantom_names)]
             if not violations7_2.empty:
                 consistent = False
                 print("🚨 IC-FirstNormalForm2 violation: Some sets contain elements that are not structs")
-                display(violations7_2)
+                custom_display(violations7_2)
 
             # IC-FirstNormalForm3: Structs can only appear at the second level
             logger.info("Checking IC-FirstNormalForm3")
-            struct_phantom_names = self.get_phantom_structs().index
-            violations7_3 = self.get_outbounds()[self.get_outbounds().index.to_frame().apply(lambda row: row["edges"] not in firstlevel_names and row["nodes"] in struct_phantom_names, axis=1)]
+            outbounds = self.get_outbounds()
+            violations7_3 = outbounds[~outbounds.index.get_level_values("edges").isin(firstlevel_names) & outbounds.index.get_level_values("nodes").isin(struct_phantom_names)]
             if not violations7_3.empty:
                 consistent = False
                 print("🚨 IC-FirstNormalForm3 violation: Some structs are not at the second level")
-                display(violations7_3)
+                custom_display(violations7_3)
 
             # IC-FirstNormalForm4: All associations from the anchor of a class must be to one (at most)
             logger.info("Checking IC-FirstNormalForm4")
@@ -69,19 +66,20 @@ class FirstNormalForm(Relational):
                     struct_name = self.get_edge_by_phantom_name(struct_phantom)
                     members = self.get_outbound_struct_by_name(struct_name).index.get_level_values("nodes").to_list()
                     anchor_points = self.get_anchor_points_by_struct_name(struct_name)
-                    dont_cross = self.get_anchor_associations_by_struct_name(struct_name)
-                    restricted_struct = self.get_restricted_struct_hypergraph(struct_name)
-                    bipartite = restricted_struct.H.remove_edges(dont_cross).bipartite()
+                    # The graph is flattened once, since it is traversed for every pair of anchor and member
+                    adjacency = to_adjacency(self.get_struct_bipartite_by_struct_name(struct_name))
+                    # Classes and associations out of the anchor only depend on the struct, so they are obtained before traversing the paths
+                    anchor_point_set = set(anchor_points)
+                    non_anchor_members = [member for member in drop_duplicates(members) if member not in anchor_point_set and (self.is_class_phantom(member) or self.is_association_phantom(member))]
                     for anchor in anchor_points:
-                        for member in set(members)-set(anchor_points):
-                            if self.is_class_phantom(member) or self.is_association_phantom(member):
-                                paths = list(nx.all_simple_paths(bipartite, source=anchor, target=member))
-                                assert len(paths) <= 1, f"☠️ Unexpected problem in '{struct_name}' on finding more than one path '{paths}' between '{anchor}' and '{member}'"
-                                if len(paths) == 1:
-                                    # Second position in the tuple is the max multiplicity
-                                    if not self.check_multiplicities_to_one(paths[0])[1]:
-                                        consistent = False
-                                        print(f"🚨 IC-FirstNormalForm4 violation: A struct '{struct_name}' has an unacceptable path (not to one) '{paths[0]}'")
+                        for member in non_anchor_members:
+                            paths = find_simple_paths(adjacency, source=anchor, target=member)
+                            assert len(paths) <= 1, f"☠️ Unexpected problem in '{struct_name}' on finding more than one path '{paths}' between '{anchor}' and '{member}'"
+                            if len(paths) == 1:
+                                # Second position in the tuple is the max multiplicity
+                                if not self.check_multiplicities_to_one(paths[0])[1]:
+                                    consistent = False
+                                    print(f"🚨 IC-FirstNormalForm4 violation: A struct '{struct_name}' has an unacceptable path (not to one) '{paths[0]}'")
         return consistent
 
     def generate_attr_projection_clause(self, attr_path: list[dict[str, str]]) -> str:
@@ -97,29 +95,27 @@ class FirstNormalForm(Relational):
         of the associations.
         :return: List of statements generated (one per table)
         """
-        statements = []
+        # Structs in the sets and column types of the attributes are resolved once for all tables
+        struct_names_by_set = self.get_struct_names_by_set_name()
+        column_types = {attr_name: "VarChar(" + str(properties.get("Size")) + ")" if properties.get("DataType") == "String" else properties.get("DataType")
+                        for attr_name, properties in self.get_attributes()["misc_properties"].items()}
+        columns_by_table = {}
         # For each table
         for table_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating create table statements", leave=config.show_progress):
-            logger.info("-- Creating table " + table_name)
-            # sentence = "DROP TABLE IF EXISTS " + table.Index[0] +" CASCADE;\n"
-            sentence = "CREATE TABLE " + table_name + " (\n"
+            logger.info("-- Creating table %s", table_name)
             # Get all the attributes in all the structs
             attr_paths = []
-            for struct_name in self.get_struct_names_inside_set_name(table_name):
+            for struct_name in struct_names_by_set.get(table_name, []):
                 attr_paths.extend(self.get_struct_attributes(struct_name))
             attr_paths = drop_duplicates(attr_paths)
-            assert len(set([self.generate_attr_projection_clause(path) for _, path in attr_paths])) == len(attr_paths), f"☠️ Table '{table_name}' has the same attribute defined twice: {attr_paths}"
-            # Add all the attributes to the CREATE TABLE sentence
-            attribute_list = []
-            for _, attr_path in attr_paths:
-                attribute = self.get_attribute_by_name(self.get_domain_attribute_from_path(attr_path))
-                if attribute["misc_properties"].get("DataType") == "String":
-                    attribute_list.append("  " + self.generate_attr_projection_clause(attr_path) + " VarChar(" + str(attribute["misc_properties"].get("Size")) + ")")
-                else:
-                    attribute_list.append("  " + self.generate_attr_projection_clause(attr_path) + " " + attribute["misc_properties"].get("DataType"))
-            sentence += ",\n".join(attribute_list) + "\n  );"
-            statements.append(sentence)
-        return statements
+            # Column names are generated only once, both to check that they are unique and to define them
+            column_names = [self.generate_attr_projection_clause(attr_path) for _, attr_path in attr_paths]
+            assert len(set(column_names)) == len(attr_paths), f"☠️ Table '{table_name}' has the same attribute defined twice: {attr_paths}"
+            # Get the definitions of all the attributes of the table
+            columns_by_table[table_name] = ["  " + column_name + " " + column_types[self.get_domain_attribute_from_path(attr_path)]
+                                            for column_name, (_, attr_path) in zip(column_names, attr_paths)]
+        # DDL sentences are only materialized at the end
+        return ["CREATE TABLE " + table_name + " (\n" + ",\n".join(attribute_list) + "\n  );" for table_name, attribute_list in columns_by_table.items()]
 
     def generate_migration_insert_statement(self, table_name: str, project: list[str], pattern: list[str], source: Relational) -> str:
         '''
@@ -150,13 +146,13 @@ class FirstNormalForm(Relational):
         :return: List of statements generated (one per table)
         """
         statements = []
+        struct_names_by_set = self.get_struct_names_by_set_name()
         # For each table
         for table_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating primary key declaration statements", leave=config.show_progress):
-            logger.info(f"-- Altering table {table_name} to add the PK")
-            sentence = "ALTER TABLE " + table_name + " ADD"
+            logger.info("-- Altering table %s to add the PK", table_name)
             # Create the PK
             # All structs in a set must share the anchor attributes (IC-Design4), so we can take any of them
-            struct_name = self.get_struct_names_inside_set_name(table_name)[0]
+            struct_name = struct_names_by_set[table_name][0]
             key_list = []
             for key in self.get_anchor_end_names_by_struct_name(struct_name):
                 if self.is_class_phantom(key):
@@ -165,8 +161,7 @@ class FirstNormalForm(Relational):
                 else:
                     key_list.append(key)
             assert key_list, f"☠️ Table '{table_name}' does not have a primary key (a.k.a. anchor in the corresponding struct) defined"
-            sentence += " PRIMARY KEY (" + ", ".join(key_list) + ");"
-            statements.append(sentence)
+            statements.append("".join(["ALTER TABLE ", table_name, " ADD PRIMARY KEY (", ", ".join(key_list), ");"]))
         return statements
 
     def generate_add_fk_statements(self) -> list[str]:
@@ -177,8 +172,9 @@ class FirstNormalForm(Relational):
         :return: List of statements generated (one per table)
         """
         statements = []
+        firstlevel_names = self.get_inbound_firstLevel().index.get_level_values("edges")
         # For each table
-        for table_referee_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating foreign key declaration statements", leave=config.show_progress):
+        for table_referee_name in tqdm(firstlevel_names, desc="Generating foreign key declaration statements", leave=config.show_progress):
             # Get all the attributes in all the structs
             attribute_list = []
             for struct_name in self.get_struct_names_inside_set_name(table_referee_name):
@@ -207,7 +203,7 @@ class FirstNormalForm(Relational):
                     # Follow the hierarchy bottom to top in order until a superclass is found to point to
                     found = False
                     for class_name in hierarchy:
-                        for table_referred_name in self.get_inbound_firstLevel().index.get_level_values("edges"):
+                        for table_referred_name in firstlevel_names:
                             # We can take any struct in the set, because all must share the anchor
                             struct_name = self.get_struct_names_inside_set_name(table_referred_name)[0]
                             anchor_points = self.get_anchor_points_by_struct_name(struct_name)
@@ -217,7 +213,7 @@ class FirstNormalForm(Relational):
                             if (len(anchor_points) == 1 and self.get_edge_by_phantom_name(anchor_points[0]) == class_name
                                     and (table_referee_name != table_referred_name or attr_proj != attr_correspondence)):
                                 found = True
-                                logger.info(f"-- Altering table {table_referee_name} to add the FK on '{attr_proj}'")
+                                logger.info("-- Altering table %s to add the FK on '%s'", table_referee_name, attr_proj)
                                 # Create the FK
                                 sentence = f"ALTER TABLE {table_referee_name} ADD FOREIGN KEY ({attr_proj}) REFERENCES {table_referred_name}({attr_correspondence});"
 
@@ -1,20 +1,30 @@
 import logging
 import warnings
+import functools
+import re
 import pandas as pd
-from IPython.display import display
 from tqdm import tqdm
 
 from . import config
 from .tools import drop_duplicates
 from .relational import Relational
 
-# Library initialization
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', 1000)
-
 logger = logging.getLogger("NonFirstNormalFormJSON")
 
 
+@functools.lru_cache(maxsize=256)
+def compile_values_pattern(attribute_names: tuple[str, ...]) -> re.Pattern:
+    '''
+    Compiles the pattern to find all the given attributes in a JSONB object (i.e., "to_jsonb(<name>)" as generated by
+    build_jsonb_object), so that values are placed in one single pass.
+    The same attributes are inserted again and again in a table, so patterns are compiled only once.
+    :param attribute_names: Names of the attributes (sorted, to share the pattern)
+    :return: Compiled pattern with the name of the attribute in the first group
+    '''
+    alternatives = "|".join(re.escape(name) for name in attribute_names)
+    return re.compile(r"to_jsonb\((" + alternatives + r")\)")
+
+
 class NonFirstNormalFormJSON(Relational):
     """
     This is a subclass of Relational that implements the code generation as denormalized inside a JSON attribute.
@@ -36,14 +46,15 @@ class NonFirstNormalFormJSON(Relational):
 
     def generate_attr_projection_clause(self, attr_path: list[dict[str, str]]) -> str:
         super().generate_attr_projection_clause(attr_path)
-        path = "value"
+        # Hops are collected in a list and joined once at the end (a set wraps all the parts collected so far)
+        path_parts = ["value"]
         for hop in attr_path[:-1]:
             if hop["kind"] == "Set":
-                path = "jsonb_array_elements(" + path + "->'" + hop.get("name") + "')"
+                path_parts = ["jsonb_array_elements(", *path_parts, "->'", hop.get("name"), "')"]
             else:
-                path += "->'" + hop.get("name") + "'"
-        path += "->>'" + attr_path[-1].get("name") + "'"
-        return path
+                path_parts.extend(["->'", hop.get("name"), "'"])
+        path_parts.extend(["->>'", attr_path[-1].get("name"), "'"])
+        return "".join(path_parts)
 
     def build_jsonb_object(self, attr_paths: list[tuple[str, list[dict[str, str]]]]) -> [str, list[str]]:
         # TODO: Generalize this to any number of nested sets
@@ -94,13 +105,13 @@ class NonFirstNormalFormJSON(Relational):
         # Remove unnecessary paths, whose attributes are actually not being migrated (this would be unnecessary if the struct name would be known)
         attr_paths = [(attr, paths) for attr, paths in attr_paths if attr in project]
         obj, grouping = self.build_jsonb_object(attr_paths)
+        # The parts of the statement are collected in a list and joined only once at the end
+        statement_parts = [f"INSERT INTO {table_name}(value)\n  SELECT {obj}\n  FROM (\n    ",
+                           source.generate_query_statement({"project": project, "pattern": pattern}, explicit_schema=True)[0], ") AS foo"]
         if grouping:
-            return (f"INSERT INTO {table_name}(value)\n  SELECT {obj}\n  FROM (\n    " +
-                                    source.generate_query_statement({"project": project, "pattern": pattern}, explicit_schema=True)[0] + ") AS foo" +
-                                    "\nGROUP BY " + ", ".join(grouping) + ";")
-        else:
-            return (f"INSERT INTO {table_name}(value)\n  SELECT {obj}\n  FROM (\n    " +
-                                    source.generate_query_statement({"project": project, "pattern": pattern}, explicit_schema=True)[0] + ") AS foo;")
+            statement_parts.extend(["\nGROUP BY ", ", ".join(grouping)])
+        statement_parts.append(";")
+        return "".join(statement_parts)
 
     def generate_values_clause(self, table_name, data_values) -> str:
         """
@@ -116,8 +127,9 @@ class NonFirstNormalFormJSON(Relational):
         obj, grouping = self.build_jsonb_object(attr_paths)
         if grouping:
             assert False, f"☠️ Unexpected grouping '{grouping}' in the insertion of '{data_values}' into '{table_name}' (insertions are not allowed in the presence of nested sets)"
-        for k, v in data_values.items():
-            obj = obj.replace("', " + k, "', " + v)
+        if data_values:
+            values_pattern = compile_values_pattern(tuple(sorted(data_values)))
+            obj = values_pattern.sub(lambda match: "to_jsonb(" + data_values[match.group(1)] + ")", obj)
         return table_name + "(value) VALUES (" + obj + ")"
 
     def generate_create_table_statements(self) -> list[str]:
@@ -129,7 +141,7 @@ class NonFirstNormalFormJSON(Relational):
         statements = []
         # For each table
         for table_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating create table statements", leave=config.show_progress):
-            logger.info("-- Creating table " + table_name)
+            logger.info("-- Creating table %s", table_name)
             # sentence = "DROP TABLE IF EXISTS " + table.Index[0] +" CASCADE;\n"
             sentence = "CREATE TABLE " + table_name + " (\n  key SERIAL,\n  value JSONB\n  );"
             statements.append(sentence)
@@ -143,14 +155,14 @@ class NonFirstNormalFormJSON(Relational):
         :return: List of statements generated (one per table)
         """
         statements = []
+        struct_names_by_set = self.get_struct_names_by_set_name()
         # For each table
         for table_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating primary key declaration statements", leave=config.show_progress):
-            logger.info(f"-- Altering table {table_name} to add the surrogate PK and a UNIQUE index for the true PK")
+            logger.info("-- Altering table %s to add the surrogate PK and a UNIQUE index for the true PK", table_name)
             statements.append(f"ALTER TABLE {table_name} ADD PRIMARY KEY (key);")
-            sentence = "CREATE UNIQUE INDEX pk_" + table_name + " ON " + table_name
             # Create the PK
             # All structs in a set must share the anchor attributes (IC-Design4), so we can take any of them
-            struct_name = self.get_struct_names_inside_set_name(table_name)[0]
+            struct_name = struct_names_by_set[table_name][0]
             key_list = []
             for key in self.get_anchor_end_names_by_struct_name(struct_name):
                 if self.is_class_phantom(key):
@@ -160,8 +172,7 @@ class NonFirstNormalFormJSON(Relational):
                     key_list.append(key)
             assert key_list, f"☠️ Table '{table_name}' does not have a primary key (a.k.a. anchor in the corresponding struct) defined"
             # This is not considering that an anchor of a struct can be in a nested struct (only at first level)
-            sentence += "((" + "), (".join(["value->>'" + k + "'" for k in key_list]) + "));"
-            statements.append(sentence)
+            statements.append("".join(["CREATE UNIQUE INDEX pk_", table_name, " ON ", table_name, "((", "), (".join(["value->>'" + k + "'" for k in key_list]), "));"]))
         return statements
 
     def generate_add_fk_statements(self) -> list[str]:
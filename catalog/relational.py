@@ -3,28 +3,48 @@ from abc import ABC, abstractmethod
 import logging
 import warnings
 import itertools
-from IPython.display import display
+from collections import deque
 import pandas as pd
 import sqlalchemy
 import hypernetx as hnx
 import json
 import re
+import csv
+from io import StringIO
+from contextlib import contextmanager
 from typing import Type, TypeVar
 from tqdm import tqdm
 
 RelationalType = TypeVar('RelationalType', bound='Relational')
 
 from . import config
-from .tools import custom_warning, drop_duplicates, custom_progress
+from .tools import custom_warning, drop_duplicates, custom_progress, custom_display, memoized
 from .catalog import Catalog
 
-# Libraries initialization
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', 1000)
-
 logger = logging.getLogger("Relational")
 warnings.showwarning = custom_warning
 
+# Any name in a predicate, to be replaced by its qualified version if it is a domain attribute
+NAME_PATTERN = re.compile(r'\b\w+\b')
+
+
+def copy_insert(table, conn, keys, data_iter) -> None:
+    '''
+    Insertion method for 'to_sql' that streams the rows through PostgreSQL COPY (as suggested in the documentation of pandas),
+    instead of parsing and planning one INSERT per row.
+    :param table: Table being written by pandas
+    :param conn: SQLAlchemy connection
+    :param keys: Names of the columns
+    :param data_iter: Iterable with the rows to be inserted
+    '''
+    buffer = StringIO()
+    csv.writer(buffer).writerows(data_iter)
+    buffer.seek(0)
+    table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    columns = ", ".join(f'"{key}"' for key in keys)
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH CSV", buffer)
+
 
 class Relational(Catalog, ABC):
     """
@@ -40,6 +60,10 @@ class Relational(Catalog, ABC):
     TABLE_EDGES = '__dorm_catalog_edges'
     TABLE_INCIDENCES = '__dorm_catalog_incidences'
     TABLE_GUARDS = '__dorm_catalog_guards'
+    # Rows of the catalog tables are inserted in batches, each one with a single multi-row INSERT
+    SAVE_CHUNKSIZE = 1000
+    # Rows of the catalog tables are fetched in batches through a server-side cursor
+    LOAD_CHUNKSIZE = 50000
 
     def __init__(self, paradigm_name=None, file_path=None, dbconf=None, dbschema=None, supersede=False):
         # This print is just to avoid silly mistakes while testing, can eventually be removed
@@ -57,32 +81,40 @@ class Relational(Catalog, ABC):
             self.dbschema = dbschema
             url = f"{self.dbconf['dbms']}://{self.dbconf['user']}:{self.dbconf['password']}@{self.dbconf['ip']}:{self.dbconf['port']}/{self.dbconf['dbname']}"
             logger.info(f"Creating database connection to '{self.dbschema}' at '{url}'")
+            # Connections are kept open in a pool and reused by all the operations of the catalog (i.e., save, queries, costs, and times)
             # Most probably pool recycle is not really necessary, but should not hurt, either
-            self.engine = sqlalchemy.create_engine(url, connect_args={"options": f"-csearch_path={self.dbschema}"}, pool_pre_ping=True, pool_recycle=1800)
+            self.engine = sqlalchemy.create_engine(url, connect_args={"options": f"-csearch_path={self.dbschema}"}, poolclass=sqlalchemy.pool.QueuePool,
+                                                   pool_size=5, max_overflow=10, pool_pre_ping=True, pool_recycle=1800)
             # Using "begin" instead of "connect", a transaction is safely managed automatically
             with self.engine.begin() as conn:
                 if supersede:
                     logger.info(f"Creating schema '{dbschema}'")
                     conn.execute(sqlalchemy.text(f"DROP SCHEMA IF EXISTS {dbschema} CASCADE;"))
                     conn.execute(sqlalchemy.text(f"CREATE SCHEMA {dbschema};"))
-                    conn.execute(sqlalchemy.text(f"COMMENT ON SCHEMA {dbschema} IS '"+"{}';"))
+                    conn.execute(sqlalchemy.text(f"COMMENT ON SCHEMA {dbschema} IS :metadata;"), {"metadata": "{}"})
                     # This creates either an empty hypergraph or reads it from a file
                     super().__init__(file_path=file_path)
                     self.metadata["paradigm"] = paradigm_name
                 else:
                     catalog_tables = [self.TABLE_NODES, self.TABLE_EDGES, self.TABLE_INCIDENCES, self.TABLE_GUARDS]
-                    if any(table not in sqlalchemy.inspect(self.engine).get_table_names() for table in catalog_tables):
-                        ValueError(f"🚨 Missing required tables '{catalog_tables}' in the database with tables {sqlalchemy.inspect(self.engine).get_table_names()} in schema '{self.dbschema}' at '{self.dbconf}' (probably not a DORM schema)")
+                    # The database is inspected only once, since every inspection is a query to the information schema
+                    existing_tables = sqlalchemy.inspect(self.engine).get_table_names()
+                    missing_tables = [table for table in catalog_tables if table not in existing_tables]
+                    if missing_tables:
+                        raise ValueError(f"🚨 Missing required tables '{missing_tables}' in the database with tables {existing_tables} in schema '{self.dbschema}' at '{self.dbconf}' (probably not a DORM schema)")
                     logger.info(f"Loading the catalog from the database connection")
-                    df_nodes = pd.read_sql_table(self.TABLE_NODES, con=self.engine)
-                    df_edges = pd.read_sql_table(self.TABLE_EDGES, con=self.engine)
-                    df_incidences = pd.read_sql_table(self.TABLE_INCIDENCES, con=self.engine)
+                    df_nodes = self.read_catalog_table(self.TABLE_NODES)
+                    df_edges = self.read_catalog_table(self.TABLE_EDGES)
+                    df_incidences = self.read_catalog_table(self.TABLE_INCIDENCES)
+                    # Properties are decoded here at once, since otherwise the library tries to evaluate every JSON string as a Python literal first
+                    for df_hypergraph in [df_nodes, df_edges, df_incidences]:
+                        df_hypergraph['misc_properties'] = [json.loads(properties) for properties in df_hypergraph['misc_properties']]
                     # There is a bug in the library, and the name of the property column for both nodes and edges is taken from "misc_properties_col"
                     H = hnx.Hypergraph(df_incidences, edge_col="edges", node_col="nodes", cell_weight_col="weight", misc_cell_properties_col="misc_properties",
                                        node_properties=df_nodes, node_weight_prop_col="weight", misc_properties_col="misc_properties",
                                        edge_properties=df_edges, edge_weight_prop_col="weight")
                     super().__init__(hypergraph=H)
-                    self.guards = pd.read_sql_table(self.TABLE_GUARDS, con=self.engine)
+                    self.guards = self.read_catalog_table(self.TABLE_GUARDS)
                     # Get domain and design
                     result = conn.execute(sqlalchemy.text("SELECT n.nspname AS schema_name, d.description AS comment FROM pg_namespace n JOIN pg_description d ON d.objoid = n.oid WHERE n.nspname=:schema;"), {"schema": dbschema.lower()})
                     row = result.fetchone()
@@ -95,6 +127,15 @@ class Relational(Catalog, ABC):
                     else:
                         self.metadata["paradigm"] = paradigm_name
 
+    def read_catalog_table(self, table_name) -> pd.DataFrame:
+        """
+        Reads one of the tables of the catalog in chunks, so that the driver does not buffer the whole result client-side.
+        :param table_name: Name of the table in the schema of the catalog
+        :return: DataFrame with all the rows of the table
+        """
+        chunks = pd.read_sql_table(table_name, con=self.engine.execution_options(stream_results=True), chunksize=self.LOAD_CHUNKSIZE)
+        return pd.concat(chunks, ignore_index=True)
+
     def save(self, file_path=None, migration_source_sch=None, migration_source_kind=None, show_sql=False) -> None:
         if file_path is not None:
             super().save(file_path)
@@ -104,24 +145,25 @@ class Relational(Catalog, ABC):
             if self.is_consistent(design="design" in self.metadata):
                 logger.info("Saving the catalog in the database")
                 custom_progress("Saving the catalog in the database")
-                df_nodes = self.H.nodes.dataframe.copy()
-                df_nodes['misc_properties'] = df_nodes['misc_properties'].apply(json.dumps)
-                df_nodes.to_sql(self.TABLE_NODES, self.engine, if_exists='replace', index=True)
-                df_edges = self.H.edges.dataframe.copy()
-                df_edges['misc_properties'] = df_edges['misc_properties'].apply(json.dumps)
-                df_edges.to_sql(self.TABLE_EDGES, self.engine, if_exists='replace', index=True)
-                df_incidences = self.H.incidences.dataframe.copy()
-                df_incidences['misc_properties'] = df_incidences['misc_properties'].apply(json.dumps)
-                df_incidences.to_sql(self.TABLE_INCIDENCES, self.engine, if_exists='replace', index=True)
-                self.guards.to_sql(self.TABLE_GUARDS, self.engine, if_exists='replace', index=True)
+                # PostgreSQL loads the hypergraph faster with COPY (guards contain lists, which are still inserted by the driver)
+                insertion_method = copy_insert if self.engine.dialect.name == "postgresql" else 'multi'
+                # All catalog tables are written in one single transaction (i.e., either all or none are replaced)
+                with self.engine.begin() as conn:
+                    for table_name, df_hypergraph in [(self.TABLE_NODES, self.H.nodes.dataframe), (self.TABLE_EDGES, self.H.edges.dataframe), (self.TABLE_INCIDENCES, self.H.incidences.dataframe)]:
+                        # A shallow copy shares the rest of columns with the hypergraph, and only the properties are replaced by their serialization
+                        df_serialized = df_hypergraph.copy(deep=False)
+                        df_serialized['misc_properties'] = [json.dumps(properties) for properties in df_hypergraph['misc_properties']]
+                        df_serialized.to_sql(table_name, conn, if_exists='replace', index=True, method=insertion_method, chunksize=self.SAVE_CHUNKSIZE)
+                    self.guards.to_sql(self.TABLE_GUARDS, conn, if_exists='replace', index=True, method='multi', chunksize=self.SAVE_CHUNKSIZE)
+                # The schema is created on its own connection, because DDL and migrations run in autocommit
                 self.create_schema(migration_source_sch=migration_source_sch, migration_source_kind=migration_source_kind, show_sql=show_sql)
                 self.metadata["tables_created"] = "design" in self.metadata
                 if migration_source_sch is not None and migration_source_kind is not None:
                     self.metadata["has_data"] = True
                 # Using "begin" instead of "connect", a transaction is safely managed automatically
                 with (self.engine.begin() as conn):
-                    statement = f"COMMENT ON SCHEMA {self.dbschema} IS '{json.dumps(self.metadata)}';"
-                    conn.execute(sqlalchemy.text(statement))
+                    # Metadata is bound as a parameter, so that it is quoted by the driver instead of being pasted in the statement
+                    conn.execute(sqlalchemy.text(f"COMMENT ON SCHEMA {self.dbschema} IS :metadata;"), {"metadata": json.dumps(self.metadata)})
             else:
                 raise ValueError("🚨 An inconsistent catalog cannot be saved in the DBMS")
         else:
@@ -132,7 +174,7 @@ class Relational(Catalog, ABC):
             visited = [edge_name]
         else:
             visited.append(edge_name)
-        for node_name in self.get_outbounds().query('edges == "' + edge_name + '"').index.get_level_values("nodes"):
+        for node_name in self.get_outbound_node_names_by_edge_name().get(edge_name, []):
             if self.is_phantom(node_name):
                 next_edge = self.get_edge_by_phantom_name(node_name)
                 assert next_edge not in visited, f"☠️ Cycle of edges detected: {visited}"
@@ -152,11 +194,12 @@ class Relational(Catalog, ABC):
             # IC-Relational1:
             logger.info("Checking IC-Relational1")
             matches6_1 = self.get_inbound_firstLevel().index.get_level_values("edges")
-            violations6_1 = self.get_sets()[self.get_sets().apply(lambda row: not row.name in matches6_1 and self.contains_set_including_transitivity_by_edge_name(row.name), axis=1)]
+            sets = self.get_sets()
+            violations6_1 = sets.loc[[set_name not in matches6_1 and self.contains_set_including_transitivity_by_edge_name(set_name) for set_name in sets.index]]
             if not violations6_1.empty:
                 consistent = False
                 print(f"🚨 IC-Relational1 violation: Sets cannot be nested due to not possible to nest 'jsonb_agg' in PostgreSQL")
-                display(violations6_1)
+                custom_display(violations6_1)
 
         return consistent
 
@@ -204,12 +247,20 @@ class Relational(Catalog, ABC):
             outputfile.write("-- Update now the metadata of the schema using 'COMMENT ON SCHEMA'\n")
         # We disable transactions by means of autocommit, because DDL should not use them. Moreover, some migration sentences time out
         with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
-            for statement in tqdm(statements, desc="Executing SQL statements", leave=config.show_progress):
+            if migration_source_sch is None or migration_source_kind is None:
+                # Without migration, all the DDL is quick and sent as one single script (PostgreSQL runs it in one round trip)
                 if show_sql:
-                    print(statement)
-                conn.execute(sqlalchemy.text(statement))
-            # It only makes sense to update statistics if data has been migrated
-            if migration_source_sch is not None and migration_source_kind is not None:
+                    print("\n".join(statements))
+                custom_progress("Executing SQL statements")
+                if statements:
+                    conn.exec_driver_sql("\n".join(statements))
+            else:
+                # Migration statements can take long, so they are executed one by one (the safety file allows resuming them)
+                for statement in tqdm(statements, desc="Executing SQL statements", leave=config.show_progress):
+                    if show_sql:
+                        print(statement)
+                    conn.execute(sqlalchemy.text(statement))
+                # It only makes sense to update statistics if data has been migrated
                 custom_progress("Updating statistics in the database")
                 conn.execute(sqlalchemy.text(update_statistics_statement))
         os.remove(safety_file)
@@ -256,7 +307,7 @@ class Relational(Catalog, ABC):
         statements = []
         # For each table
         for table_name in tqdm(self.get_inbound_firstLevel().index.get_level_values("edges"), desc="Generating migration statements", leave=config.show_progress):
-            logger.info(f"-- Generating data migration for table {table_name}")
+            logger.info("-- Generating data migration for table %s", table_name)
             # For each struct in the table, we have to create a different extraction query
             for struct_name in self.get_struct_names_inside_set_name(table_name):
                 # TODO: Ignore sibling overlapping subclasses in the set (otherwise, data will be migrated twice and violate PK)
@@ -292,43 +343,43 @@ class Relational(Catalog, ABC):
         """
         pass
 
-    def generate_joins(self, tables, query_classes, query_associations, alias_table, join_attr, schema_name: str = "", visited: dict[str, str] = None, previous_laterals: list[str] = None) -> str:
+    @memoized
+    def get_query_connection_ends(self, query_classes: tuple[str, ...], query_associations: tuple[str, ...]) -> tuple[list[str], list[tuple[str, str, str]]]:
         """
-        Find the connections between tables, according to the required classes and associations
-        end generate the corresponding join clause
-        Consider that the pattern of associations is acyclic, which means that we can add joins incrementally one by one
-        There are four cases of potential joins
-        1- a class in common between the current table and a visited one
-        2- a class in the current table corresponding to a loose end in a visited one
-        3- a loose end in the current table corresponding to a class in a visited one
-        4- a loose end in the current table corresponding to another loose end in a visited one, and the corresponding class is not in the query
-        :param tables: List of tables
-        :param query_classes: List of classes to be provided by the query (can be empty)
-        :param query_associations: List of associations to be provided by the query (can be empty)
-        :param alias_table: Dictionary with the alias of every table in the query
-        :param join_attr: Dictionary indicating where the domain attribute can be found in the table
-        :param visited: Dictionary with all visited classes and from which table they are taken
-        :param schema_name: Schema name to be concatenated in front of every table in the FROM clause
-        :return: String containing the join clause of the tables received as parameter
+        Finds the superclasses and association ends that can connect tables in a query.
+        These only depend on the query, so they are obtained once for all the alternative combinations of tables.
+        :param query_classes: Tuple of classes to be provided by the query (can be empty)
+        :param query_associations: Tuple of associations to be provided by the query (can be empty)
+        :return: List of classes in the query and their superclasses, and list of association ends in the query as triplets of phantom, class and end names
         """
-        # TODO: Consider that there could be more than one connected component (provided by the query) in the table
-        #   (associations should be used to choose the right one)
-        if visited is None:
-            first_table = True
-            visited = dict()
-            previous_laterals = []
-        else:
-            first_table = False
-        unjoinable = []
-        associations = self.get_outbound_associations()[self.get_outbound_associations().index.get_level_values("edges").isin(query_associations)]
-        query_superclasses = query_classes.copy()
+        outbound_associations = self.get_outbound_associations()
+        associations = outbound_associations[outbound_associations.index.get_level_values("edges").isin(query_associations)]
+        query_superclasses = list(query_classes)
         for class_name in query_classes:
             query_superclasses.extend(self.get_superclasses_by_class_name(class_name))
         query_superclasses = drop_duplicates(query_superclasses)
-        while tables:
-            # Take any table and find all its potentially connection points
-            current_table = tables.pop(0)
-            # Get potential attributes to plug the current table
+        association_ends = [(phantom_name, self.get_edge_by_phantom_name(phantom_name), properties["End_name"])
+                            for phantom_name, properties in zip(associations.index.get_level_values("nodes"), associations["misc_properties"])]
+        return query_superclasses, association_ends
+
+    def get_plugs_by_table(self, tables, query_classes, query_associations) -> dict[str, list[tuple[str, str]]]:
+        """
+        Finds the potential connection points of every table, according to the required classes and associations.
+        These do not depend on the order in which tables are joined, so they can be obtained once for all of them.
+        :param tables: List of tables
+        :param query_classes: List of classes to be provided by the query (can be empty)
+        :param query_associations: List of associations to be provided by the query (can be empty)
+        :return: Dictionary with the pairs of attribute names that can be plugged for every table (first belongs to the table itself)
+        """
+        query_superclasses, association_ends = self.get_query_connection_ends(tuple(query_classes), tuple(query_associations))
+        # Association ends are indexed once (by their name and by their class phantom), instead of scanning them for every plug
+        ends_by_end_name = {}
+        end_names_by_phantom = {}
+        for phantom_name, end_class_name, end_name in association_ends:
+            ends_by_end_name.setdefault(end_name, []).append((phantom_name, end_class_name))
+            end_names_by_phantom.setdefault(phantom_name, []).append(end_name)
+        plugs_by_table = {}
+        for current_table in drop_duplicates(tables):
             plugs = []  # This will contain pairs of attribute names that can be plugged (first belongs to the current table)
             # For every struct in the table
             struct_name_list = self.get_struct_names_inside_set_name(current_table)
@@ -344,26 +395,65 @@ class Relational(Catalog, ABC):
                         class_name = self.get_edge_by_phantom_name(node_name)
                         if class_name in query_superclasses:
                             # Any class in the query is a potential connection point per se
-                            plugs.append((self.get_class_id_by_name(class_name), self.get_class_id_by_name(class_name)))
+                            class_id = self.get_class_id_by_name(class_name)
+                            plugs.append((class_id, class_id))
                             # Also, it can connect to a loose end if it participates in an association
-                            for ass in associations.itertuples():
-                                if self.get_edge_by_phantom_name(ass.Index[1]) in [class_name]+self.get_superclasses_by_class_name(class_name):
-                                    plugs.append((self.get_class_id_by_name(class_name), ass.misc_properties["End_name"]))
+                            class_hierarchy = [class_name]+self.get_superclasses_by_class_name(class_name)
+                            for _, end_class_name, end_name in association_ends:
+                                if end_class_name in class_hierarchy:
+                                    plugs.append((class_id, end_name))
                 for end_name in self.get_loose_association_end_names_by_struct_name(struct_name):
-                    for ass in associations.itertuples():
-                        if end_name == ass.misc_properties["End_name"]:
-                            # Loose end can connect to a class id
-                            plugs.append((end_name, self.get_class_id_by_name(self.get_edge_by_phantom_name(ass.Index[1]))))
-                            # A loose end in the current table can correspond to another loose end in a visited one, as soon as the corresponding class is not in the query
-                            if self.get_edge_by_phantom_name(ass.Index[1]) not in query_classes:
-                                for ass2 in associations.itertuples():
-                                    if ass.Index[1] == ass2.Index[1]:
-                                        plugs.append((end_name, ass2.misc_properties["End_name"]))
-            # Check if the other ends of any of the connection points has been visited before
-            joins = []
-            laterals = ""
-            for plug in plugs:
-                if plug[1] in visited:
+                    for phantom_name, end_class_name in ends_by_end_name.get(end_name, []):
+                        # Loose end can connect to a class id
+                        plugs.append((end_name, self.get_class_id_by_name(end_class_name)))
+                        # A loose end in the current table can correspond to another loose end in a visited one, as soon as the corresponding class is not in the query
+                        if end_class_name not in query_classes:
+                            for other_end_name in end_names_by_phantom[phantom_name]:
+                                plugs.append((end_name, other_end_name))
+            plugs_by_table[current_table] = plugs
+        return plugs_by_table
+
+    def generate_joins(self, tables, query_classes, query_associations, alias_table, join_attr, schema_name: str = "") -> str:
+        """
+        Find the connections between tables, according to the required classes and associations
+        end generate the corresponding join clause
+        Consider that the pattern of associations is acyclic, which means that we can add joins incrementally one by one
+        There are four cases of potential joins
+        1- a class in common between the current table and a visited one
+        2- a class in the current table corresponding to a loose end in a visited one
+        3- a loose end in the current table corresponding to a class in a visited one
+        4- a loose end in the current table corresponding to another loose end in a visited one, and the corresponding class is not in the query
+        :param tables: List of tables
+        :param query_classes: List of classes to be provided by the query (can be empty)
+        :param query_associations: List of associations to be provided by the query (can be empty)
+        :param alias_table: Dictionary with the alias of every table in the query
+        :param join_attr: Dictionary indicating where the domain attribute can be found in the table
+        :param schema_name: Schema name to be concatenated in front of every table in the FROM clause
+        :return: String containing the join clause of the tables received as parameter
+        """
+        # TODO: Consider that there could be more than one connected component (provided by the query) in the table
+        #   (associations should be used to choose the right one)
+        # Tables are taken one by one, and those that cannot be joined yet are queued back until some other table is joined
+        pending = deque(tables)
+        # Dictionary with all visited classes and from which table they are taken
+        visited = dict()
+        # Lateral joins already generated (only checked for membership)
+        previous_laterals = set()
+        join_clauses = []
+        # Potential attributes to plug every table do not depend on the order of the joins, so they are obtained only once
+        plugs_by_table = self.get_plugs_by_table(tables, query_classes, query_associations)
+        while pending:
+            first_table = not join_clauses
+            unjoinable = []
+            while pending:
+                # Take any table and find all its potentially connection points
+                current_table = pending.popleft()
+                plugs = plugs_by_table[current_table]
+                # Check if the other ends of any of the connection points has been visited before
+                joins = []
+                laterals = []
+                # Only the connection points whose other end has been visited can generate a join
+                for plug in [plug for plug in plugs if plug[1] in visited]:
                     if 'jsonb_array_elements' in join_attr[plug[1]+"@"+visited[plug[1]]] and 'jsonb_array_elements' in join_attr[plug[0]+"@"+current_table]:
                         # TODO: When joining two tables by a multi-valued attributes, a cycle of table references is created with the lateral join
                         #       We cannot generate a lateral join in this case, because its table would come afterwards, so the alias would not be defined in time
@@ -375,8 +465,8 @@ class Relational(Catalog, ABC):
                             lateral_alias = alias_table[visited[plug[1]]] + "_" + plug[1]
                             # We avoid repetitions of lateral joins
                             if lateral_alias not in previous_laterals:
-                                laterals += "  JOIN LATERAL " + join_attr[plug[1]+"@"+visited[plug[1]]].replace("value", alias_table[visited[plug[1]]] + ".value").split(")")[0] + ") AS " + lateral_alias + " ON TRUE\n"
-                                previous_laterals.append(lateral_alias)
+                                laterals.append("  JOIN LATERAL " + join_attr[plug[1]+"@"+visited[plug[1]]].replace("value", alias_table[visited[plug[1]]] + ".value").split(")")[0] + ") AS " + lateral_alias + " ON TRUE\n")
+                                previous_laterals.add(lateral_alias)
                             lhs = lateral_alias + join_attr[plug[1]+"@"+visited[plug[1]]].split(")")[1]
                         else:
                             lhs = alias_table[visited[plug[1]]]+"."+join_attr[plug[1]+"@"+visited[plug[1]]]
@@ -385,37 +475,40 @@ class Relational(Catalog, ABC):
                             lateral_alias = alias_table[current_table] + "_" + plug[1]
                             # We avoid repetitions of lateral joins
                             if lateral_alias not in previous_laterals:
-                                laterals += "  JOIN LATERAL " + join_attr[plug[1]+"@"+current_table].replace("value", alias_table[current_table] + ".value").split(")")[0] + ") AS " + lateral_alias + " ON TRUE\n"
-                                previous_laterals.append(lateral_alias)
+                                laterals.append("  JOIN LATERAL " + join_attr[plug[1]+"@"+current_table].replace("value", alias_table[current_table] + ".value").split(")")[0] + ") AS " + lateral_alias + " ON TRUE\n")
+                                previous_laterals.add(lateral_alias)
                             rhs = lateral_alias + join_attr[plug[1]+"@"+current_table].split(")")[1]
                         else:
                             rhs = alias_table[current_table]+"."+join_attr[plug[0]+"@"+current_table]
                         joins.append(lhs + "=" + rhs)
-            if not first_table and not joins:
-                unjoinable.append(current_table)
-            else:
-                tables += unjoinable
-                unjoinable = []
-                break
-        # Duplication removal should not be necessary, but they appear because of multiple structs in a table
-        joins = drop_duplicates(joins)
-        # Get all the connection point in the table and mark them as visited
-        for plug in plugs:
-            visited[plug[0]] = current_table
-        # Create the join clause
-        join_clause = schema_name + current_table + " " + alias_table[current_table]
-        if not first_table:
-            if unjoinable:
-                raise ValueError(f"🚨 Tables {unjoinable} are not joinable in the query with tables {drop_duplicates(visited.values())}")
-            join_clause = laterals + "  JOIN "+join_clause+" ON "+" AND ".join(joins)
-        if not tables:
-            return join_clause
-        else:
-            return join_clause+'\n'+self.generate_joins(tables, query_classes, query_associations, alias_table, join_attr, schema_name, visited, previous_laterals)
+                if not first_table and not joins:
+                    unjoinable.append(current_table)
+                else:
+                    pending.extend(unjoinable)
+                    unjoinable = []
+                    break
+            # Duplication removal should not be necessary, but they appear because of multiple structs in a table
+            joins = drop_duplicates(joins)
+            # Get all the connection point in the table and mark them as visited
+            for plug in plugs:
+                visited[plug[0]] = current_table
+            # Create the join clause
+            join_clause = schema_name + current_table + " " + alias_table[current_table]
+            if not first_table:
+                if unjoinable:
+                    raise ValueError(f"🚨 Tables {unjoinable} are not joinable in the query with tables {drop_duplicates(visited.values())}")
+                join_clause = "".join([*laterals, "  JOIN ", join_clause, " ON ", " AND ".join(joins)])
+            join_clauses.append(join_clause)
+        return "\n".join(join_clauses)
 
     def find_implicit_class(self, required_attributes, pattern_edges) -> str:
         subclasses = {}
         struct_containers_for_class = {}
+        # Elements of the structs are grouped by node only once for all the attributes
+        struct_incidences = self.get_outbound_structs().index
+        struct_names_by_node = {}
+        for struct_name, node_name in zip(struct_incidences.get_level_values("edges"), struct_incidences.get_level_values("nodes")):
+            struct_names_by_node.setdefault(node_name, set()).add(struct_name)
         for current_attribute_name in required_attributes:
             class_name = self.get_class_by_attribute_name(current_attribute_name)
             # Since the query must be connected, some class must appear in the pattern
@@ -423,18 +516,80 @@ class Relational(Catalog, ABC):
                 if class_name in pattern_edges:
                     subclasses[class_name] = [class_name]+self.get_superclasses_by_class_name(class_name)
                     subphantoms = [self.get_phantom_of_edge_by_name(c) for c in subclasses[class_name]]
-                    struct_containers_for_class[class_name] = set(self.get_outbound_structs()[self.get_outbound_structs().index.get_level_values("nodes").isin(subphantoms)].index.get_level_values('edges'))
+                    struct_containers_for_class[class_name] = set().union(*[struct_names_by_node.get(subphantom, set()) for subphantom in subphantoms])
                 else:
                     for subclass in self.get_subclasses_by_class_name(class_name):
                         if subclass in pattern_edges:
                             subclasses[class_name] = [subclass]+self.get_superclasses_by_class_name(subclass)
                             subphantoms = [self.get_phantom_of_edge_by_name(c) for c in subclasses[class_name]]
-                            struct_containers_for_class[class_name] = set(self.get_outbound_structs()[self.get_outbound_structs().index.get_level_values("nodes").isin(subphantoms)].index.get_level_values('edges'))
-            struct_containers_for_attribute = set(self.get_outbound_structs()[self.get_outbound_structs().index.get_level_values("nodes") == current_attribute_name].index.get_level_values('edges'))
+                            struct_containers_for_class[class_name] = set().union(*[struct_names_by_node.get(subphantom, set()) for subphantom in subphantoms])
+            struct_containers_for_attribute = struct_names_by_node.get(current_attribute_name, set())
             # Check if there is any struct that contains both the attribute and any one of the classes
             if not struct_containers_for_attribute.intersection(struct_containers_for_class[class_name]):
                 return subclasses[class_name][0]
 
+    def generate_query_alternative_statement(self, tables_combination, project_attributes, filter_clause, class_names, association_names, schema_name: str = "") -> str:
+        """
+        Generates the SQL statement of a query for a given combination of tables.
+        It only depends on its parameters and the catalog, so every alternative combination of tables can be generated independently.
+        :param tables_combination: List of tables to be used in the query
+        :param project_attributes: List of attributes to be projected
+        :param filter_clause: Predicate to be checked in the WHERE clause
+        :param class_names: List of classes in the query
+        :param association_names: List of associations in the query
+        :param schema_name: Schema name to be concatenated in front of every table in the FROM clause
+        :return: The SQL statement using the given tables
+        """
+        custom_progress("----Generating the query with tables %s", tables_combination)
+        custom_progress("------Getting aliases")
+        alias_table, proj_attr, join_attr, location_attr = self.get_aliases(tables_combination)
+        custom_progress("------Getting discriminants")
+        conditions = [filter_clause] + self.get_discriminants(tables_combination, class_names)
+        # We need to generate a subquery if there are filter unwinding jsons, because PostgreSQL does not allow this in the where clause
+        # Thus, the internal query unwinds everything, and the external check the conditions on these attributes
+        custom_progress("------Preparing filter predicate")
+        conditions_internal = []
+        conditions_external = []
+        for condition in conditions:
+            condition_attributes = self.parse_predicate(condition)
+            if any('jsonb_array_elements' in proj_attr[a] for a in condition_attributes):
+                conditions_external.append(condition)
+            else:
+                conditions_internal.append(condition)
+        filter_attributes_external = drop_duplicates(self.parse_predicate(" AND ".join(conditions_external)))
+        custom_progress("------Generating FROM clause")
+        # Simple case of only one table required by the query
+        if len(tables_combination) == 1:
+            # Build the FROM clause
+            from_clause = "\nFROM " + schema_name + tables_combination[0]
+            qualified_attr = proj_attr
+        # Case with several tables that require joins
+        else:
+            # Build the FROM clause
+            custom_progress("--------Generating JOIN clauses")
+            from_clause = "\nFROM " + self.generate_joins(tables_combination, class_names, association_names, alias_table, join_attr, schema_name)
+            # Add the alias to all attributes, since there is more than one table now
+            # This is done once, so that both SELECT and WHERE clauses simply look up the qualified names
+            qualified_attr = {dom_attr_name: attr_proj.replace("value", location_attr[dom_attr_name] + ".value") if 'jsonb_array_elements' in attr_proj else location_attr[dom_attr_name] + "." + attr_proj
+                              for dom_attr_name, attr_proj in tqdm(proj_attr.items(), desc="--------Adding table aliases to attributes", leave=config.show_progress, disable=not config.show_progress)}
+        custom_progress("------Generating SELECT clause")
+        # Build the SELECT clause
+        # The parts of the sentence are collected in a list and joined only once at the end
+        sentence_parts = ["SELECT " + ", ".join([qualified_attr[a] + " AS " + a for a in project_attributes + filter_attributes_external]), from_clause]
+        # Add the WHERE clause
+        custom_progress("------Generating WHERE clause")
+        if conditions_internal != [] and conditions_internal != ["TRUE"]:
+            # Replace the domain name by the name in the table in the WHERE clause
+            # Every condition is scanned only once, and whole names are looked up (so that no name can be replaced inside a longer one)
+            conditions_internal = [NAME_PATTERN.sub(lambda match: qualified_attr.get(match.group(0), match.group(0)), s) for s in conditions_internal]
+            sentence_parts.append("\nWHERE " + " AND ".join(f"({cond})" for cond in conditions_internal))
+        sentence = "".join(sentence_parts)
+        if conditions_external:
+            sentence = "".join(["SELECT " + ", ".join(project_attributes),
+                                "\nFROM (\n" + sentence + "\n) _",
+                                "\nWHERE " + " AND ".join(f"({cond})" for cond in conditions_external)])
+        return sentence
+
     def generate_query_statement(self, spec, explicit_schema=False) -> list[str]:
         """
         Generates SQL statements corresponding to the given query.
@@ -465,57 +620,9 @@ class Relational(Catalog, ABC):
             if len(query_alternatives) > 1:
                 warnings.warn(f"⚠️ The query may be ambiguous, since it can be solved by using different combinations of tables: {query_alternatives}")
                 query_alternatives = sorted(query_alternatives, key=len)
+            # Every alternative combination of tables is generated independently of the others
             for tables_combination in query_alternatives:
-                custom_progress(f"----Generating the query with tables {tables_combination}")
-                custom_progress("------Getting aliases")
-                alias_table, proj_attr, join_attr, location_attr = self.get_aliases(tables_combination)
-                custom_progress("------Getting discriminants")
-                conditions = [filter_clause] + self.get_discriminants(tables_combination, class_names)
-                # We need to generate a subquery if there are filter unwinding jsons, because PostgreSQL does not allow this in the where clause
-                # Thus, the internal query unwinds everything, and the external check the conditions on these attributes
-                custom_progress("------Preparing filter predicate")
-                conditions_internal = []
-                conditions_external = []
-                for condition in conditions:
-                    condition_attributes = self.parse_predicate(condition)
-                    if any('jsonb_array_elements' in proj_attr[a] for a in condition_attributes):
-                        conditions_external.append(condition)
-                    else:
-                        conditions_internal.append(condition)
-                filter_attributes_external = drop_duplicates(self.parse_predicate(" AND ".join(conditions_external)))
-                custom_progress("------Generating FROM clause")
-                # Simple case of only one table required by the query
-                if len(tables_combination) == 1:
-                    # Build the FROM clause
-                    from_clause = "\nFROM " + schema_name + tables_combination[0]
-                # Case with several tables that require joins
-                else:
-                    # Build the FROM clause
-                    custom_progress("--------Generating JOIN clauses")
-                    from_clause = "\nFROM " + self.generate_joins(tables_combination, class_names, association_names, alias_table, join_attr, schema_name)
-                    # Add the alias to all attributes, since there is more than one table now
-                    for dom_attr_name, attr_proj in tqdm(proj_attr.items(), desc="--------Adding table aliases to attributes", leave=config.show_progress):
-                        if 'jsonb_array_elements' in attr_proj:
-                            proj_attr[dom_attr_name] = attr_proj.replace("value", location_attr[dom_attr_name] + ".value")
-                        else:
-                            proj_attr[dom_attr_name] = location_attr[dom_attr_name] + "." + attr_proj
-                custom_progress("------Generating SELECT clause")
-                # Build the SELECT clause
-                sentence = "SELECT " + ", ".join([proj_attr[a] + " AS " + a for a in project_attributes + filter_attributes_external]) + from_clause
-                # Add the WHERE clause
-                custom_progress("------Generating WHERE clause")
-                if conditions_internal != [] and conditions_internal != ["TRUE"]:
-                    # Replace the domain name by the name in the table in the WHERE clause
-                    for dom_attr_name, attr_proj in proj_attr.items():
-                        conditions_internal = [re.sub(r'\b' + re.escape(dom_attr_name) + r'\b', attr_proj, s) for s in conditions_internal]
-                    sentence += "\nWHERE " + " AND ".join(f"({cond})" for cond in conditions_internal)
-                if conditions_external:
-                    sentence_with_filter = "SELECT " + ", ".join(project_attributes)
-                    sentence_with_filter += "\nFROM (\n" + sentence + "\n) _"
-                    sentence_with_filter += "\nWHERE " + " AND ".join(f"({cond})" for cond in conditions_external)
-                else:
-                    sentence_with_filter = sentence
-                sentences.append(sentence_with_filter)
+                sentences.append(self.generate_query_alternative_statement(tables_combination, project_attributes, filter_clause, class_names, association_names, schema_name))
         # If some classes are implicitly stored in the current design (i.e. stored only in their subclasses)
         else:
             custom_progress(f"Query requires UNION")
@@ -534,7 +641,7 @@ class Relational(Catalog, ABC):
             subclasses = self.get_outbound_generalization_subclasses().loc[taken_generalization.edges]
             subqueries = []
             for subclass_phantom_name in subclasses.index.get_level_values("nodes"):
-                custom_progress(f"--Generating query for subclass {subclass_phantom_name}")
+                custom_progress("--Generating query for subclass %s", subclass_phantom_name)
                 new_query = spec.copy()
                 # Replace the superclass by one of its subclasses in the query pattern
                 new_query["pattern"] = [self.get_edge_by_phantom_name(subclass_phantom_name) if elem == superclass_name else elem for elem in new_query["pattern"]]
@@ -546,8 +653,11 @@ class Relational(Catalog, ABC):
                 union_clause = "\nUNION ALL\n"
             else:
                 union_clause = "\nUNION\n"
-            for combination in list(itertools.product(*drop_duplicates(subqueries))):
-                sentences.append("(" + union_clause.join(combination) + ")")
+            # Combinations are generated lazily and repeated sentences are only kept once (a dictionary keeps their order)
+            union_sentences = {}
+            for combination in itertools.product(*drop_duplicates(subqueries)):
+                union_sentences.setdefault("(" + union_clause.join(combination) + ")")
+            sentences.extend(union_sentences)
         return sentences
 
     @abstractmethod
@@ -587,22 +697,48 @@ class Relational(Catalog, ABC):
         if not self.metadata.get("tables_created", False):
             print(f"🚨 There are no tables to be queried in the schema '{self.dbschema}' (according to its metadata)")
 
-    def execute(self, statement) -> sqlalchemy.Sequence[sqlalchemy.Row] | int:
+    @contextmanager
+    def session(self):
+        """
+        Keeps one connection to the DBMS open, so that it can be shared by many calls to execute, get_cost and get_time
+        (e.g., while comparing all the alternatives of a batch of queries), instead of taking one per call.
+        Statements are autocommitted, so that no transaction is kept open (holding locks) between the calls.
+        :return: Connection to be passed to those methods
+        """
+        self.check_execution()
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            yield conn
+
+    @contextmanager
+    def get_connection(self, conn=None):
+        """
+        Gives the connection of the current session if there is one, or a new one from the engine otherwise.
+        :param conn: Connection of the session, if any
+        :return: Connection to be used
+        """
+        if conn is not None:
+            yield conn
+        else:
+            with self.engine.connect() as new_conn:
+                yield new_conn
+
+    def execute(self, statement, conn=None) -> sqlalchemy.Sequence[sqlalchemy.Row] | int:
         """
         Executes a statement in the engine associated to the catalog.
         :param statement: SQL statement to be executed (has to be either INSERT or UPDATE).
+        :param conn: Connection of a session to be reused (a new one is taken from the engine if not given).
         :return: Set of rows resulting from the query execution or 1 (if it was an insertion).
         """
         self.check_execution()
         if re.search(r"\$\d+", statement):
             raise ValueError(f"🚨 Cannot execute a parametrized statement '{statement}' (we can get the cost of its generic plan, though)")
-        with self.engine.connect() as conn:
+        with self.get_connection(conn) as conn:
             result = conn.execute(sqlalchemy.text(statement))
             if statement.startswith("INSERT "):
                 if not self.metadata.get("has_data", False):
                     self.metadata["has_data"] = True
-                    statement = f"COMMENT ON SCHEMA {self.dbschema} IS '{json.dumps(self.metadata)}';"
-                    conn.execute(sqlalchemy.text(statement))
+                    # Metadata is bound as a parameter, so that it is quoted by the driver instead of being pasted in the statement
+                    conn.execute(sqlalchemy.text(f"COMMENT ON SCHEMA {self.dbschema} IS :metadata;"), {"metadata": json.dumps(self.metadata)})
                 conn.commit()
                 return 1
             elif statement.startswith("SELECT "):
@@ -610,11 +746,12 @@ class Relational(Catalog, ABC):
             else:
                 assert False, f"☠️ Unknown kind of statement (neither SELECT nor INSERT) to be executed: '{statement}'"
 
-    def get_cost(self, query) -> float:
+    def get_cost(self, query, conn=None) -> float:
         """
         Estimates the cost of a query in the engine associated to the catalog.
         If the query has some parameter of the form "$<number>", then "(GENERIC_PLAN)" flag is used
         :param query: SQL query to be executed.
+        :param conn: Connection of a session to be reused (a new one is taken from the engine if not given).
         :return: Unitless estimated cost.
         """
         self.check_execution()
@@ -622,7 +759,7 @@ class Relational(Catalog, ABC):
             statement = "EXPLAIN (GENERIC_PLAN) " + query
         else:
             statement = "EXPLAIN " + query
-        with self.engine.connect() as conn:
+        with self.get_connection(conn) as conn:
             first_row = conn.execute(sqlalchemy.text(statement)).fetchone()
         assert first_row is not None, "☠️ Empty access plan"
         # Extract the float (e.g., from "cost=0.00..159.16")
@@ -634,16 +771,17 @@ class Relational(Catalog, ABC):
         except ValueError:
             raise ValueError(f"🚨 Cost parsing failed in the access plan of the query '{first_row}'")
 
-    def get_time(self, query) -> float:
+    def get_time(self, query, conn=None) -> float:
         """
         Estimates the execution time of a query in the engine associated to the catalog (requires true execution!!!).
         :param query: SQL query to be executed.
+        :param conn: Connection of a session to be reused (a new one is taken from the engine if not given).
         :return: Estimated time in milliseconds.
         """
         self.check_execution()
         if re.search(r"\$\d+", query):
             raise ValueError(f"🚨 Cannot get the time of a parametrized statement '{query}' (we can get the cost of its generic plan, though)")
-        with self.engine.connect() as conn:
+        with self.get_connection(conn) as conn:
             result = conn.execute(sqlalchemy.text(f"EXPLAIN (ANALYZE, SUMMARY) " + query)).fetchall()
         assert len(result) > 0, "☠️ Empty access plan"
         last_row = result[-1]
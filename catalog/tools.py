@@ -1,6 +1,10 @@
 import os
+import functools
+import itertools
 from pathlib import Path
 import pandas as pd
+import networkx as nx
+from IPython.display import display
 from . import config
 
 
@@ -9,9 +13,16 @@ def custom_warning(message, category, filename, lineno, file=None, line=None):
         print(f"{message} 👉 {os.path.basename(filename)}:{lineno}")
 
 
-def custom_progress(message):
+def custom_progress(message, *args):
+    # Like in logging, arguments are only formatted into the message if it is actually shown
     if config.show_progress:
-        print(message)
+        print(message % args if args else message)
+
+
+def custom_display(data):
+    # Wide display is only set while showing our own dataframes, instead of changing the options of pandas for everybody
+    with pd.option_context('display.max_columns', None, 'display.width', 1000):
+        display(data)
 
 
 def extract_up_to_folder(path_str, folder_name) -> Path:
@@ -25,43 +36,137 @@ def extract_up_to_folder(path_str, folder_name) -> Path:
     return sub_path
 
 
+def memoized(method):
+    '''
+    Decorator to keep the result of a method of the catalog that only depends on its arguments and the hypergraph.
+    Results are kept in the cache of the instance, which must be emptied every time the hypergraph is modified.
+    Lists and dataframes are copied on return, so that callers can freely modify them without altering the cache.
+    Calls with unhashable arguments (e.g., the list of visited elements in recursive calls) are simply not cached.
+    :param method: Method to be memoized
+    :return: Memoized method
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        if key not in self._cache:
+            self._cache[key] = method(self, *args, **kwargs)
+        result = self._cache[key]
+        if isinstance(result, list):
+            return list(result)
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        return result
+    return wrapper
+
+
 def drop_duplicates(dirty_list):
-    unique_elems = []
-    [unique_elems.append(elem) for elem in dirty_list if elem not in unique_elems]
-    return unique_elems
+    '''
+    Removes duplicates from a list, keeping the order of first appearance.
+    Hashable elements (and lists of them, like combinations of tables) are deduplicated in linear time with a dictionary,
+    while other unhashable elements (e.g., pairs of attribute and path) are compared with all the elements already kept.
+    :param dirty_list: List of elements possibly containing duplicates
+    :return: List of unique elements
+    '''
+    try:
+        unique_elems = {}
+        for elem in dirty_list:
+            unique_elems.setdefault((type(elem), tuple(elem) if isinstance(elem, list) else elem), elem)
+        return list(unique_elems.values())
+    except TypeError:
+        unique_elems = []
+        [unique_elems.append(elem) for elem in dirty_list if elem not in unique_elems]
+        return unique_elems
 
 
 def combine_buckets(patterns_list: list[list[str]]) -> list[list[str]]:
     '''
     Combines all lists of patterns in a smart way, by removing duplicates ASAP
+    Buckets are combined one by one (from the last to the first), so that non-minimal combinations are pruned at every step.
     :param patterns_list:
     :return: list of combinations without duplicates
     '''
-    if len(patterns_list) == 0:
-        return [[]]
-    else:
-        current_pattern = patterns_list.pop(0)
-        combinations = []
-        for combination in combine_buckets(patterns_list):
-            for current_table in current_pattern:
-                if current_table in combination:
-                    combinations.append(combination)
-                else:
-                    temp = combination + [current_table]
-                    temp.sort()
-                    combinations.append(temp)
-        minimal_combinations = []
-        for c1 in combinations:
-            found = False
-            for c2 in combinations:
-                if c1 != c2 and all([t in c1 for t in c2]):
-                    found = True
-            if not found and c1 not in minimal_combinations:
-                minimal_combinations.append(c1)
-        return minimal_combinations
+    combinations = [[]]
+    for current_pattern in reversed(patterns_list):
+        # A dictionary keeps the candidates in order of appearance without duplicates (and their sets to compare them)
+        candidates = {}
+        for combination, current_table in itertools.product(combinations, current_pattern):
+            if current_table in combination:
+                candidate = combination
+            else:
+                candidate = sorted(combination + [current_table])
+            candidates.setdefault(tuple(candidate), frozenset(candidate))
+        # Only minimal combinations are kept (i.e., those not including any other one)
+        combinations = [list(candidate) for candidate, tables in candidates.items()
+                        if not any(other_tables < tables for other_tables in candidates.values())]
+    return combinations
+
+
+def to_adjacency(graph: nx.Graph) -> dict:
+    '''
+    Flattens a networkx graph into a plain dictionary of neighbour lists (keeping the order of networkx).
+    It is worth it when the same graph is traversed many times, since plain lists are much cheaper to iterate than networkx views.
+    :param graph: Graph to be flattened
+    :return: Dictionary with the list of neighbours of every node
+    '''
+    return {node: list(neighbours) for node, neighbours in graph.adjacency()}
+
+
+def find_simple_paths(graph: nx.Graph | dict, source, target, limit: int = 2) -> list[list]:
+    '''
+    Iterative depth-first search of simple paths between two nodes, which stops as soon as the limit of paths is reached.
+    Paths come in the same order as in networkx.all_simple_paths, but we avoid enumerating all of them when we only need to know if there is none, one or more.
+    :param graph: Graph where to look for the paths (either networkx or its adjacency dictionary)
+    :param source: Starting node
+    :param target: Ending node
+    :param limit: Maximum number of paths to be found
+    :return: List of at most limit paths, each of them being the list of nodes from source to target
+    '''
+    if source not in graph:
+        raise nx.NodeNotFound(f"source node {source} not in graph")
+    # A target outside the graph (e.g., because the struct does not contain it) is simply not reachable
+    if target not in graph:
+        return []
+    if source == target:
+        return [[source]]
+    paths = []
+    current_path = [source]
+    visited = {source}
+    stack = [iter(graph[source])]
+    while stack:
+        next_node = next((node for node in stack[-1] if node not in visited), None)
+        if next_node is None:
+            stack.pop()
+            visited.discard(current_path.pop())
+        elif next_node == target:
+            paths.append(current_path + [target])
+            if len(paths) >= limit:
+                break
+        else:
+            current_path.append(next_node)
+            visited.add(next_node)
+            stack.append(iter(graph[next_node]))
+    return paths
 
 
 def df_difference(df1, df2):
+    '''
+    Finds the rows of the first dataframe that are neither in the second nor repeated in the first one.
+    Series (i.e., lists of names) are compared with a vectorized membership check, which avoids concatenating both.
+    In that case, the names to be removed can also be given in any other collection (e.g., a set), without building a series.
+    :param df1: Dataframe or series to be filtered
+    :param df2: Dataframe, series or collection of names with the rows to be removed
+    :return: Rows of the first dataframe (renumbered) that do not appear in the second one
+    '''
+    if isinstance(df1, pd.Series) and not isinstance(df2, pd.DataFrame):
+        kept = ~(df1.isin(df2) | df1.duplicated(keep=False))
+        difference = df1.loc[kept.astype(bool)].reset_index(drop=True)
+        # Concatenation only keeps the name if both series share it
+        difference.name = df1.name if df1.name == getattr(df2, "name", None) else None
+        return difference
     return pd.concat([df1, df2, df2], ignore_index=True).drop_duplicates(keep=False)
 
 
@@ -1,5 +1,6 @@
 import logging
 import sys
+import contextlib
 import argparse
 from pathlib import Path
 import json
@@ -68,50 +69,56 @@ if __name__ == "__main__":
             cost_per_query = [["Order", "Group ID", "Weight", "Cost"]]
         sum_cost = 0
         sum_frequencies = 0
-        for i, spec in enumerate(query_specs):
-            if True:
-                print(f"\n-- Running query specification {i+1}")
-                queries = cat.generate_query_statement(spec, explicit_schema=False)
-                min_position = 0
-                if args.print_cost or args.save_cost:
-                    cost_vector = []
-                    for q in queries:
-                        cost_vector.append(cat.get_cost(q))
-                    min_position = cost_vector.index(min(cost_vector))
-                if args.print_time:
-                    estimated_time = cat.get_time(queries[min_position])
-                if args.show_sql:
-                    print(r"--\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\")
-                    if len(queries) > 1:
-                        print(f"Number of queries generated: {len(queries)}")
-                        if args.print_cost or args.save_cost:
-                            print("Best one is:")
+        # All queries share one connection to the DBMS (only opened if the DBMS is actually needed)
+        if args.print_cost or args.save_cost or args.print_time or args.print_rows or args.print_counter:
+            session = cat.session()
+        else:
+            session = contextlib.nullcontext()
+        with session as conn:
+            for i, spec in enumerate(query_specs):
+                if True:
+                    print(f"\n-- Running query specification {i+1}")
+                    queries = cat.generate_query_statement(spec, explicit_schema=False)
+                    min_position = 0
+                    if args.print_cost or args.save_cost:
+                        cost_vector = []
+                        for q in queries:
+                            cost_vector.append(cat.get_cost(q, conn=conn))
+                        min_position = cost_vector.index(min(cost_vector))
+                    if args.print_time:
+                        estimated_time = cat.get_time(queries[min_position], conn=conn)
+                    if args.show_sql:
+                        print(r"--\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\")
+                        if len(queries) > 1:
+                            print(f"Number of queries generated: {len(queries)}")
+                            if args.print_cost or args.save_cost:
+                                print("Best one is:")
+                            else:
+                                print("First one is:")
+                        print(queries[min_position]+";")
+                        print("--//////////////////////////////////////////")
+                    if args.print_cost or args.save_cost:
+                        current_frec = spec.get("frequency", 1)
+                        if args.print_time:
+                            cost_per_query.append([i + 1, spec.get("group_id", ""), current_frec, cost_vector[min_position], estimated_time])
                         else:
-                            print("First one is:")
-                    print(queries[min_position]+";")
-                    print("--//////////////////////////////////////////")
-                if args.print_cost or args.save_cost:
-                    current_frec = spec.get("frequency", 1)
+                            cost_per_query.append([i + 1, spec.get("group_id", ""), current_frec, cost_vector[min_position]])
+                        sum_frequencies += current_frec
+                        sum_cost += cost_vector[min_position]*current_frec
+                        if args.print_cost:
+                            print("Vector of costs:", cost_vector)
+                            print("Minimum position:", min_position)
+                            print(f"Estimated cost: {cost_vector[min_position]:.2f}")
+                            print(f"Weighted cost: {cost_vector[min_position]*current_frec:.2f} (for a weight of {current_frec:.2f})")
                     if args.print_time:
-                        cost_per_query.append([i + 1, spec.get("group_id", ""), current_frec, cost_vector[min_position], estimated_time])
-                    else:
-                        cost_per_query.append([i + 1, spec.get("group_id", ""), current_frec, cost_vector[min_position]])
-                    sum_frequencies += current_frec
-                    sum_cost += cost_vector[min_position]*current_frec
-                    if args.print_cost:
-                        print("Vector of costs:", cost_vector)
-                        print("Minimum position:", min_position)
-                        print(f"Estimated cost: {cost_vector[min_position]:.2f}")
-                        print(f"Weighted cost: {cost_vector[min_position]*current_frec:.2f} (for a weight of {current_frec:.2f})")
-                if args.print_time:
-                    print("Estimated time: ", estimated_time)
-                if args.print_rows or args.print_counter:
-                    rows = cat.execute(queries[min_position])
-                    if args.print_rows:
-                        for row in rows:
-                            print(row)
-                    if args.print_counter:
-                        print(f"Number of rows: {len(rows)}")
+                        print("Estimated time: ", estimated_time)
+                    if args.print_rows or args.print_counter:
+                        rows = cat.execute(queries[min_position], conn=conn)
+                        if args.print_rows:
+                            for row in rows:
+                                print(row)
+                        if args.print_counter:
+                            print(f"Number of rows: {len(rows)}")
         if args.print_cost:
             print("=======================================")
             print(f"Average cost: {sum_cost/sum_frequencies:.2f}", )